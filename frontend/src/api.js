@@ -1,4 +1,4 @@
-export async function api(path, opts = {}) {
+async function request(path, opts = {}) {
   const base = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
   const headers = {
@@ -15,5 +15,16 @@ export async function api(path, opts = {}) {
     throw new Error(await res.text());
   }
 
+  return res;
+}
+
+export async function api(path, opts = {}) {
+  const res = await request(path, opts);
   return res.json();
 }
+
+// Keyset-paginated lists: one page plus the cursor for the next (null on the last page)
+export async function apiPage(path, opts = {}) {
+  const res = await request(path, opts);
+  return { items: await res.json(), next: res.headers.get('X-Next-Cursor') };
+}
@@ -1,22 +1,31 @@
 import React, { useEffect, useState } from "react";
-import { api } from "../api";
+import { api, apiPage } from "../api";
 
 export default function Scores({ token, onRedoAttempt }) {
   const [scores, setScores] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [categories, setCategories] = useState([]);
 
   useEffect(() => {
     if (!token) {
       setScores([]);
+      setNextCursor(null);
       setCategories([]);
       return;
     }
 
-    api("/scores", {
+    apiPage("/scores", {
       headers: { Authorization: "Bearer " + token },
     })
-      .then(setScores)
-      .catch(() => setScores([]));
+      .then(({ items, next }) => {
+        setScores(items);
+        setNextCursor(next);
+      })
+      .catch(() => {
+        setScores([]);
+        setNextCursor(null);
+      });
 
     api("/quiz/categories", {
       headers: { Authorization: "Bearer " + token },
@@ -25,6 +34,23 @@ export default function Scores({ token, onRedoAttempt }) {
       .catch(() => setCategories([]));
   }, [token]);
 
+  // The server sends one page at a time; older attempts come in on request
+  async function loadMore() {
+    setLoadingMore(true);
+    try {
+      const { items, next } = await apiPage(
+        "/scores?cursor=" + encodeURIComponent(nextCursor),
+        { headers: { Authorization: "Bearer " + token } }
+      );
+      setScores((prev) => [...prev, ...items]);
+      setNextCursor(next);
+    } catch {
+      // Keep what's shown; the button stays for another try
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   function categoryName(id) {
     const match = categories.find((c) => String(c.id) === String(id));
     return match ? match.name : id;
@@ -45,7 +71,10 @@ export default function Scores({ token, onRedoAttempt }) {
             </p>
           </div>
           {scores.length > 0 && (
-            <div style={badgeStyle}>{scores.length} attempts</div>
+            <div style={badgeStyle}>
+              {scores.length}
+              {nextCursor ? "+" : ""} attempts
+            </div>
           )}
         </div>
 
@@ -77,19 +106,32 @@ export default function Scores({ token, onRedoAttempt }) {
                     <td style={tdStyle}>{s.difficulty}</td>
                     {onRedoAttempt && (
                       <td style={{ ...tdStyle, textAlign: "right" }}>
-                        <button
-                          type="button"
-                          onClick={() => onRedoAttempt(s)}
-                          style={redoButtonStyle}
-                        >
-                          Redo
-                        </button>
+                        {/* Keyword-search quizzes ("search") can't be restarted by category */}
+                        {/^\d+$/.test(String(s.category)) && (
+                          <button
+                            type="button"
+                            onClick={() => onRedoAttempt(s)}
+                            style={redoButtonStyle}
+                          >
+                            Redo
+                          </button>
+                        )}
                       </td>
                     )}
                   </tr>
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                style={loadMoreButtonStyle}
+              >
+                {loadingMore ? "Loading..." : "Show older attempts"}
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -178,3 +220,9 @@ const redoButtonStyle = {
     "linear-gradient(135deg, rgba(99, 102, 241, 0.1), rgba(59, 130, 246, 0.15))",
   color: "#1d4ed8",
 };
+
+const loadMoreButtonStyle = {
+  ...redoButtonStyle,
+  display: "block",
+  margin: "12px auto 0",
+};
@@ -3,14 +3,6 @@ import { api } from '../api';
 import Nav from '../components/Nav';
 import Scores from '../components/Scores';
 
-// -------- Shuffle Helper --------
-function shuffle(arr) {
-  return arr
-    .map((v) => ({ v, s: Math.random() }))
-    .sort((a, b) => a.s - b.s)
-    .map((o) => o.v);
-}
-
 // -------- Shared Styles --------
 const appShellStyle = {
   fontFamily:
@@ -130,7 +122,9 @@ export default function App() {
   const [category, setCategory] = useState(9);
   const [difficulty, setDifficulty] = useState('easy');
   const [items, setItems] = useState([]);
+  const [sessionId, setSessionId] = useState(null);
   const [answers, setAnswers] = useState({});
+  const [quizError, setQuizError] = useState('');
   const [stage, setStage] = useState(token ? 'pick' : 'login');
   const [score, setScore] = useState(0);
   const [page, setPage] = useState('home');
@@ -145,30 +139,6 @@ export default function App() {
   const [emailStatus, setEmailStatus] = useState('');
   const [emailError, setEmailError] = useState('');
 
-  const ATTEMPT_KEY_PREFIX = 'quiz_attempt_';
-
-  function saveAttemptSnapshot(attemptId, payload) {
-    try {
-      localStorage.setItem(
-        `${ATTEMPT_KEY_PREFIX}${attemptId}`,
-        JSON.stringify(payload),
-      );
-    } catch (e) {
-      console.error('Failed to save attempt snapshot', e);
-    }
-  }
-
-  function loadAttemptSnapshot(attemptId) {
-    try {
-      const raw = localStorage.getItem(`${ATTEMPT_KEY_PREFIX}${attemptId}`);
-      if (!raw) return null;
-      return JSON.parse(raw);
-    } catch (e) {
-      console.error('Failed to load attempt snapshot', e);
-      return null;
-    }
-  }
-
   // ------------------- EFFECTS -------------------
   useEffect(() => {
     if (!token) {
@@ -276,22 +246,21 @@ export default function App() {
   }
 
   // ------------------- QUIZ ACTIONS -------------------
+  // The server keeps the answers and scores the quiz; items only carry the
+  // question and its (already shuffled) options.
   async function startWithParams(cat, diff, amount) {
     const data = await api(
       `/quiz/start?category=${cat}&difficulty=${diff}&amount=${amount}`,
       { headers: { Authorization: 'Bearer ' + token } },
     );
 
-    const enriched = data.items.map((q) => ({
-      ...q,
-      options: shuffle([q.correct_answer, ...q.incorrect_answers]),
-    }));
-
     setCategory(Number(cat));
     setDifficulty(diff);
     setQuestionCount(amount);
-    setItems(enriched);
+    setItems(data.items);
+    setSessionId(data.session_id);
     setAnswers({});
+    setQuizError('');
     setStage('play');
     setPage('home');
   }
@@ -300,43 +269,41 @@ export default function App() {
     await startWithParams(category, difficulty, questionCount);
   }
 
-  function pick(idx, opt) {
+  // Each answer is sent as soon as it's picked; the server only takes the first one
+  async function pick(idx, opt) {
+    if (answers[idx] !== undefined) return;
     setAnswers((prev) => ({ ...prev, [idx]: opt }));
+    setQuizError('');
+    try {
+      await api(`/quiz/sessions/${sessionId}/answers`, {
+        method: 'POST',
+        headers: { Authorization: 'Bearer ' + token },
+        body: JSON.stringify({ index: idx, answer: opt }),
+      });
+    } catch (e) {
+      console.error('Failed to save answer', e);
+      setAnswers((prev) => {
+        const next = { ...prev };
+        delete next[idx];
+        return next;
+      });
+      setQuizError('Could not save that answer, please pick again.');
+    }
   }
 
   async function submit() {
-    const correct = items.reduce(
-      (acc, q, i) => acc + (answers[i] === q.correct_answer ? 1 : 0),
-      0,
-    );
-    setScore(correct);
-
+    setQuizError('');
     try {
-      const savedAttempt = await api('/scores', {
+      const result = await api(`/quiz/sessions/${sessionId}/finish`, {
         method: 'POST',
         headers: { Authorization: 'Bearer ' + token },
-        body: JSON.stringify({
-          total: items.length,
-          correct,
-          category: String(category),
-          difficulty,
-        }),
       });
-
-      if (savedAttempt && savedAttempt.id != null) {
-        saveAttemptSnapshot(savedAttempt.id, {
-          id: savedAttempt.id,
-          total: items.length,
-          category: String(category),
-          difficulty,
-          items,
-        });
-      }
+      setScore(result.correct);
+      setStage('result');
     } catch (e) {
-      console.error('Failed to submit score', e);
+      console.error('Failed to finish quiz', e);
+      setQuizError('Could not get your score, please try submitting again.');
     }
-
-    setStage('result');
   }
 
   async function handleRedoAttempt(attempt) {
@@ -345,19 +312,9 @@ export default function App() {
     // Move away from Scores page so PLAY stage renders
     setPage('home');
 
-    const snapshot = loadAttemptSnapshot(attempt.id);
-    if (snapshot && Array.isArray(snapshot.items) && snapshot.items.length) {
-      setCategory(Number(snapshot.category));
-      setDifficulty(snapshot.difficulty || 'easy');
-      const nextTotal = snapshot.total || snapshot.items.length;
-      setQuestionCount(nextTotal);
-      setItems(snapshot.items);
-      setAnswers({});
-      setStage('play');
-      return;
-    }
-
-    // Fallback if we don't have a snapshot (older attempts)
+    // A new quiz with the same settings; only the server knows the old answers.
+    // Keyword-search quizzes have no category to start from.
+    if (!/^\d+$/.test(String(attempt.category))) return;
     const cat = attempt.category;
     const diff = attempt.difficulty || 'easy';
     const amount = attempt.total || questionCount || 10;
@@ -392,7 +349,12 @@ export default function App() {
         headers: { Authorization: 'Bearer ' + token },
         body: JSON.stringify({ email: profileEmailInput }),
       });
-      setProfile(updated);
+      // Changing the email revokes the old token; carry on with the new one
+      if (updated.access_token) {
+        localStorage.setItem('token', updated.access_token);
+        setToken(updated.access_token);
+      }
+      setProfile({ email: updated.email, name: updated.name });
       setEmailStatus('Email updated.');
     } catch {
       setEmailError('Could not update email.');
@@ -827,7 +789,8 @@ export default function App() {
           <div style={{ ...cardStyle, marginTop: 32 }}>
             <h2 style={sectionTitleStyle}>Answer the questions</h2>
             <p style={subheadingStyle}>
-              Tap an option for each question, then submit to see your score.
+              Tap an option for each question (answers are final), then submit
+              to see your score.
             </p>
 
             <div style={{ display: 'grid', gap: 14, marginTop: 12 }}>
@@ -866,8 +829,9 @@ export default function App() {
                         <input
                           type="radio"
                           name={'q' + i}
-                          checked={answers[i] === opt}
-                          onChange={() => pick(i, opt)}
+                          checked={answers[q.index] === opt}
+                          disabled={answers[q.index] !== undefined}
+                          onChange={() => pick(q.index, opt)}
                         />
                         <span>{opt}</span>
                       </label>
@@ -890,6 +854,7 @@ export default function App() {
             >
               Submit answers
             </button>
+            {quizError && <div style={errorStyle}>{quizError}</div>}
           </div>
         </div>
       </div>
@@ -0,0 +1,50 @@
+import os, secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from app.core.hashing import hasher
+from app.core import profiling
+from app.core.profiling import profiles, slow_queries
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and token and secrets.compare_digest(token, ADMIN_TOKEN))
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Without ADMIN_TOKEN configured the admin endpoints don't exist
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/hashing")
+def hashing_stats():
+    """Per-operation bcrypt timings (wall = queue + hash), for tuning BCRYPT_ROUNDS."""
+    return hasher.stats()
+
+
+@router.get("/slow-queries")
+def slow_query_log(limit: int = Query(50, ge=1, le=1000), route: Optional[str] = None):
+    """Most recent SQL statements slower than SLOW_QUERY_MS, newest first."""
+    entries = [e for e in slow_queries.entries() if route is None or e["route"] == route]
+    return {"threshold_ms": profiling.SLOW_QUERY_MS, "queries": entries[:limit]}
+
+
+@router.get("/profiles")
+def profile_list():
+    """Recent request profiles (send X-Profile: 1 with the admin token to take one), newest first."""
+    return [{k: v for k, v in p.items() if k not in ("functions", "stacks")} for p in profiles.entries()]
+
+
+@router.get("/profiles/{profile_id}")
+def profile(profile_id: int):
+    p = profiles.get(profile_id)
+    if p is None:
+        raise HTTPException(status_code=404, detail="Profile not found (only the most recent ones are kept)")
+    return p
@@ -1,33 +1,27 @@
-import os
-from google.oauth2 import id_token as google_id_token
-from google.auth.transport import requests as google_requests
-from fastapi import APIRouter, HTTPException, Depends, Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from app.core.security import (
-    create_access_token,
+    Principal,
+    create_user_token,
     hash_password,
-    verify_password,
+    verify_and_update_password,
     get_current_user,
+    invalidate_principal,
 )
-from app.db.schemas import LoginIn, TokenOut, UserProfile, UserUpdate
+from app.db.schemas import LoginIn, TokenOut, UserProfile, UserUpdate, UserUpdated
 from app.db.models import User
-from app.db.session import SessionLocal
+from app.db.session import get_db
+from app.core.google_auth import CertsUnavailable, GoogleTokenVerifier, get_google_verifier
+from app.core.etag import bump, conditional, make_etag
 
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/register", response_model=TokenOut)
-def register(body: LoginIn, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == body.email).first()
+async def register(body: LoginIn, db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(User).where(User.email == body.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already in use")
 
@@ -36,37 +30,47 @@ def register(body: LoginIn, db: Session = Depends(get_db)):
 
     new_user = User(
         email=body.email,
-        password=hash_password(body.password),
+        password=await hash_password(body.password),
         name=display_name,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
 
     return TokenOut(
-        access_token=create_access_token({"sub": body.email})
+        access_token=create_user_token(new_user)
     )
 
 
 @router.post("/login", response_model=TokenOut)
-def login(body: LoginIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == body.email).first()
+async def login(body: LoginIn, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.email == body.email))
 
-    if not user:
+    # OAuth-only accounts have no password to check
+    if not user or not user.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if not verify_password(body.password, user.password):
+    ok, new_hash = await verify_and_update_password(body.password, user.password)
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Stored hash predates the current bcrypt settings: upgrade it while we have the password
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     return TokenOut(
-        access_token=create_access_token({"sub": body.email})
+        access_token=create_user_token(user)
     )
 
 @router.post("/google", response_model=TokenOut)
-def login_with_google(payload: dict, db: Session = Depends(get_db)):
+async def login_with_google(
+    payload: dict,
+    db: AsyncSession = Depends(get_db),
+    verifier: GoogleTokenVerifier = Depends(get_google_verifier),
+):
     """
     Frontend sends: { "id_token": "<google id_token>" }
-    We verify the token with Google, extract email/name, create user if needed,
+    We verify the token against Google's (cached) signing certs, extract email/name, create user if needed,
     and return our own JWT (TokenOut).
     """
     id_token = payload.get("id_token")
@@ -74,11 +78,13 @@ def login_with_google(payload: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Missing id_token")
 
     try:
-        # Verify token and get claims
-        claims = google_id_token.verify_oauth2_token(id_token, google_requests.Request(), GOOGLE_CLIENT_ID)
+        # Verify token and get claims (only touches the network when the cached certs are stale)
+        claims = await run_in_threadpool(verifier.verify, id_token)
         # claims will contain 'email', 'email_verified', 'name', 'picture', etc.
     except ValueError as e:
         raise HTTPException(status_code=401, detail=f"Invalid Google token: {e}")
+    except CertsUnavailable:
+        raise HTTPException(status_code=503, detail="Google sign-in is unavailable, try again later")
 
     # Require email_verified to be true (optional but recommended)
     if not claims.get("email_verified"):
@@ -88,41 +94,50 @@ def login_with_google(payload: dict, db: Session = Depends(get_db)):
     name = claims.get("name") or email.split("@")[0]
 
     # Find or create user
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         # create a user without password (OAuth-only)
         user = User(email=email, password="", name=name)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
     else:
         # keep name in sync if not set
         if not user.name and name:
             user.name = name
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.flush()
+            # The profile changed: same transaction, so /auth/me's ETag can't go stale
+            await db.execute(bump([user.id]))
+            await db.commit()
 
-    # Return JWT token for our app (sub = email)
-    token = create_access_token({"sub": email})
+    # Return JWT token for our app (sub = email, uid = user id)
+    token = create_user_token(user)
     return TokenOut(access_token=token)
 
 
 @router.get("/me", response_model=UserProfile)
-def read_me(current: str = Depends(get_current_user), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == current).first()
+async def read_me(
+    request: Request,
+    response: Response,
+    current: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    user = await db.get(User, current.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    not_modified = conditional(request, response, make_etag(user.id, user.data_version))
+    if not_modified:
+        return not_modified
     return UserProfile(email=user.email, name=user.name)
 
 
-@router.patch("/me", response_model=UserProfile)
-def update_me(
+@router.patch("/me", response_model=UserUpdated)
+async def update_me(
     body: UserUpdate,
-    current: str = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = db.query(User).filter(User.email == current).first()
+    user = await db.get(User, current.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -131,28 +146,52 @@ def update_me(
         user.name = body.name.strip()
 
     # Update email
-    if body.email is not None:
+    email_changed = body.email is not None and body.email != user.email
+    if email_changed:
         # Check if email already exists
-        existing = db.query(User).filter(User.email == body.email).first()
+        existing = await db.scalar(select(User).where(User.email == body.email))
         if existing and existing.id != user.id:
             raise HTTPException(status_code=400, detail="Email already in use")
 
         user.email = body.email
+        # Tokens carry the old address: revoke them all, the caller gets a new one below
+        user.token_version = User.token_version + 1
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.flush()
+    # In SQL, so a score write committing alongside can't be overwritten
+    await db.execute(bump([user.id]))
+    await db.commit()
+    invalidate_principal(user.id)
+
+    token = None
+    if email_changed:
+        await db.refresh(user, ["token_version"])
+        token = create_user_token(user)
+    return UserUpdated(email=user.email, name=user.name, access_token=token)
+
+
+@router.post("/logout-all", status_code=204)
+async def logout_all(current: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Revoke every token issued for this account, the one making the request included."""
+    result = await db.execute(
+        update(User).where(User.id == current.id).values(token_version=User.token_version + 1)
+    )
+    if not result.rowcount:
+        raise HTTPException(status_code=404, detail="User not found")
+    await db.commit()
+    invalidate_principal(current.id)
 
-    return UserProfile(email=user.email, name=user.name)
+    return Response(status_code=204)
 
 
 @router.delete("/me", status_code=204)
-def delete_me(current: str = Depends(get_current_user), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == current).first()
-    if not user:
+async def delete_me(current: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # One statement; ON DELETE CASCADE takes the attempts and rollups with it
+    result = await db.execute(delete(User).where(User.id == current.id))
+    if not result.rowcount:
         raise HTTPException(status_code=404, detail="User not found")
-
-    db.delete(user)
-    db.commit()
+    await db.commit()
+    invalidate_principal(current.id)
 
     return Response(status_code=204)
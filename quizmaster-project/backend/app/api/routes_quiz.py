@@ -1,36 +1,204 @@
-import os, requests, html
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from app.core.security import get_current_user
-from app.db.schemas import Category, Question, StartOut
+import os, logging, random
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.security import Principal, get_current_user
+from app.core import question_bank, quiz_sessions
+from app.core.question_bank import refiller
+from app.core.cache import TTLCache
+from app.core.metrics import watch_cache
+from app.core.upstream import TriviaClient, get_trivia
+from app.core.responses import JSONResponse
+from app.db import search
+from app.db.schemas import AnswerIn, AnswerOut, Category, ScoreOut, SearchHit, SessionOut, SessionQuestion, StartOut
+from app.db.session import get_db
+from app.db.writer import committed, writer
 
 router = APIRouter()
-BASE = os.getenv("EXTERNAL_API_BASE","https://opentdb.com")
+log = logging.getLogger(__name__)
+# The category list barely ever changes; keep it for an hour and refresh in the background for a day after that
+categories_cache = watch_cache("categories", TTLCache(ttl=int(os.getenv("CATEGORIES_TTL", "3600")), swr=24 * 60 * 60))
+# A keyword quiz is a random pick from this many of the best search hits
+SEARCH_POOL = 100
+
+def _from_bank(rows) -> list[dict]:
+    return [{"question": q.question, "correct_answer": q.correct_answer, "incorrect_answers": q.incorrect_answers} for q in rows]
+
+async def _start_session(current: Principal, category: Optional[int], difficulty: str, items: list[dict]) -> JSONResponse:
+    session = quiz_sessions.new_session(current.id, category, difficulty, items)
+    await quiz_sessions.sessions.save(session)
+    # Shaped like SessionQuestion; the answers stay on the server until each question is answered
+    questions = [{"index": i, "question": q, "options": list(options)} for i, (q, _, options) in enumerate(session.questions)]
+    return JSONResponse({"items": questions, "session_id": session.id})
+
+async def load_categories(trivia: TriviaClient) -> list[dict]:
+    async def fetch() -> list[dict]:
+        cats = (await trivia.get_json("/api_category.php")).get("trivia_categories") or []
+        return [{"id": c["id"], "name": c["name"]} for c in cats]
+
+    return await categories_cache.get_or_load("categories", fetch)
 
 @router.get("/categories", response_model=List[Category])
-def categories(current: str = Depends(get_current_user)):
+async def categories(current: Principal = Depends(get_current_user), trivia: TriviaClient = Depends(get_trivia)):
     try:
-        r = requests.get(f"{BASE}/api_category.php", timeout=10)
-        r.raise_for_status()
-        cats = r.json().get("trivia_categories") or []
-        return [Category(id=c["id"], name=c["name"]) for c in cats]
+        return JSONResponse(await load_categories(trivia))
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"External API error: {e}")
 
+@router.get("/search", response_model=List[SearchHit])
+async def search_questions(
+    q: str = Query(min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    current: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Question bank matches for q, best first. Only the local bank is searched, never opentdb."""
+    rows = await search.search(db, q, limit, category, difficulty)
+    return JSONResponse([{"id": r.id, "category": r.category, "difficulty": r.difficulty, "question": r.question} for r in rows])
+
+async def _start_search(current: Principal, db: AsyncSession, q: str, category: Optional[int], difficulty: Optional[str], amount: int) -> JSONResponse:
+    rows = await search.search(db, q, max(amount, SEARCH_POOL), category, difficulty)
+    if not rows:
+        raise HTTPException(status_code=404, detail="No questions match that search")
+    rows = random.sample(rows, min(amount, len(rows)))
+    return await _start_session(current, category, difficulty or "mixed", _from_bank(rows))
+
 @router.get("/start", response_model=StartOut)
-def start(category: int, difficulty: str="easy", amount: int = 10, current: str = Depends(get_current_user)):
+async def start(
+    category: Optional[int] = None,
+    difficulty: Optional[str] = None,
+    # opentdb's own cap; the bank is queried with this as a LIMIT
+    amount: int = Query(10, ge=1, le=question_bank.BATCH_SIZE),
+    q: Optional[str] = None,
+    current: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    trivia: TriviaClient = Depends(get_trivia),
+):
+    """A question set plus a session id; the session keeps it for resuming and scores the answers.
+
+    With q, the questions come from a keyword search of the local bank (category and
+    difficulty then only narrow it down); otherwise category is required.
+    """
+    if q is not None:
+        return await _start_search(current, db, q, category, difficulty, amount)
+    if category is None:
+        raise HTTPException(status_code=422, detail="category or q is required")
+    difficulty = difficulty or "easy"
+    rows = await question_bank.sample(db, category, difficulty, amount)
+    if len(rows) >= amount:
+        return await _start_session(current, category, difficulty, _from_bank(rows))
+
+    # Bank is short for this bucket: top it up in the background and fall back to a live fetch
+    refiller.request(category, difficulty)
     try:
         params = {"amount": amount, "type": "multiple", "category": category, "difficulty": difficulty}
-        r = requests.get(f"{BASE}/api.php", params=params, timeout=10)
-        r.raise_for_status()
-        results = r.json().get("results") or []
-        items = []
-        for q in results:
-            items.append(Question(
-                question=html.unescape(q["question"]),
-                correct_answer=html.unescape(q["correct_answer"]),
-                incorrect_answers=[html.unescape(a) for a in q["incorrect_answers"]]
-            ))
-        return StartOut(items=items)
+        items = question_bank.parse_results((await trivia.get_json("/api.php", params=params)).get("results") or [])
     except Exception as e:
+        if rows:
+            return await _start_session(current, category, difficulty, _from_bank(rows))
         raise HTTPException(status_code=502, detail=f"External API error: {e}")
+    try:
+        await question_bank.store_questions(db, category, difficulty, items)
+    except Exception:
+        # Banking them is a bonus; this request already has its questions
+        log.exception("Storing fetched questions failed")
+        await db.rollback()
+    return await _start_session(current, category, difficulty, items)
+
+async def _session(session_id: str, current: Principal) -> quiz_sessions.QuizSession:
+    s = await quiz_sessions.sessions.get(session_id)
+    # Other users' sessions look exactly like expired ones
+    if s is None or s.user_id != current.id:
+        raise HTTPException(status_code=404, detail="Quiz session not found or expired")
+    return s
+
+async def _save(s: quiz_sessions.QuizSession):
+    try:
+        await quiz_sessions.sessions.save(s)
+    except quiz_sessions.SessionConflict:
+        raise HTTPException(status_code=409, detail="Quiz session was updated by another request, reload it")
+
+def _question(s: quiz_sessions.QuizSession, index: int) -> SessionQuestion:
+    question, _, options = s.questions[index]
+    return SessionQuestion(index=index, question=question, options=list(options))
+
+@router.get("/sessions/{session_id}", response_model=SessionOut)
+async def resume(session_id: str, current: Principal = Depends(get_current_user)):
+    """Everything needed to redraw a quiz after a reload, without the correct answers."""
+    s = await _session(session_id, current)
+    return SessionOut(
+        session_id=s.id, category=s.category, difficulty=s.difficulty, total=len(s.questions),
+        answered=s.answered, correct=s.correct, next_index=s.next_index(), finished=s.attempt_id is not None,
+        questions=[_question(s, i) for i in range(len(s.questions))], answers=s.answers,
+    )
+
+@router.get("/sessions/{session_id}/next", response_model=SessionQuestion, responses={204: {"description": "Every question is answered"}})
+async def next_question(session_id: str, current: Principal = Depends(get_current_user)):
+    s = await _session(session_id, current)
+    index = s.next_index()
+    if index is None:
+        return Response(status_code=204)
+    return _question(s, index)
+
+@router.post("/sessions/{session_id}/answers", response_model=AnswerOut)
+async def answer(session_id: str, body: AnswerIn, current: Principal = Depends(get_current_user)):
+    s = await _session(session_id, current)
+    if s.attempt_id is not None:
+        raise HTTPException(status_code=409, detail="Quiz session is already finished")
+    if not 0 <= body.index < len(s.questions):
+        raise HTTPException(status_code=400, detail="No such question")
+    if s.answers[body.index] is not None:
+        raise HTTPException(status_code=409, detail="Question already answered")
+    _, correct_answer, options = s.questions[body.index]
+    if body.answer not in options:
+        raise HTTPException(status_code=400, detail="Answer is not one of the options")
+    s.answers[body.index] = body.answer
+    await _save(s)
+    return AnswerOut(
+        index=body.index, correct=body.answer == correct_answer, correct_answer=correct_answer,
+        answered=s.answered, remaining=len(s.questions) - s.answered,
+    )
+
+@router.post("/sessions/{session_id}/finish", response_model=ScoreOut)
+async def finish(session_id: str, current: Principal = Depends(get_current_user)):
+    """Score the session (unanswered questions count as wrong) and save it as an attempt."""
+    s = await _session(session_id, current)
+    category = "search" if s.category is None else str(s.category)
+    score = {"total": len(s.questions), "correct": s.correct, "category": category, "difficulty": s.difficulty, "verified": True}
+    if s.attempt_id:
+        return ScoreOut(id=s.attempt_id, **score)
+    if s.attempt_id is not None:
+        raise HTTPException(status_code=409, detail="Quiz session is being finished")
+    # Claim it first so a double-submitted finish can't record two attempts
+    s.attempt_id = 0
+    await _save(s)
+    try:
+        a = (await committed(writer.submit([{**score, "user_id": current.id}])))[0]
+    except Exception:
+        # Release the claim so the player can retry; a failure here mustn't hide the original error
+        try:
+            await _settle_claim(s, None)
+        except Exception:
+            log.exception("Releasing the finish claim on session %s failed", s.id)
+        raise
+    # The attempt is committed: answer with it even if the session can't be updated
+    try:
+        await _settle_claim(s, a.id)
+    except Exception:
+        log.exception("Recording attempt %s on session %s failed", a.id, s.id)
+    return ScoreOut(id=a.id, **score)
+
+async def _settle_claim(s: quiz_sessions.QuizSession, attempt_id: Optional[int], tries: int = 3):
+    """Replace our finish claim (attempt_id == 0) with the outcome, reloading if the session was saved meanwhile."""
+    for _ in range(tries):
+        s.attempt_id = attempt_id
+        try:
+            return await quiz_sessions.sessions.save(s)
+        except quiz_sessions.SessionConflict:
+            s = await quiz_sessions.sessions.get(s.id)
+            # Expired, or no longer our claim: nothing left to record
+            if s is None or s.attempt_id != 0:
+                return
+    raise quiz_sessions.SessionConflict(s.id)
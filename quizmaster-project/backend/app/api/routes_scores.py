@@ -1,39 +1,179 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.security import get_current_user
-from app.db.session import SessionLocal, engine
-from app.db.models import Base, User, Attempt
-from app.db.schemas import SubmitIn, ScoreOut
+import base64, csv, io, json
+from datetime import datetime
+from typing import List, Literal, Optional
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.etag import conditional, user_etag
+from app.core.responses import JSONResponse, records
+from app.core.security import Principal, get_current_user
+from app.db.session import AsyncSessionLocal, get_db
+from app.db.models import Attempt, ScoreRollup, User
+from app.db.rollups import ALL
+from app.db.writer import committed, writer
+from app.db.schemas import SubmitIn, ScoreOut, StatsOut, SummaryOut, LeaderboardEntry
 
 router = APIRouter()
-Base.metadata.create_all(bind=engine)
+MAX_BATCH = 100
+# ScoreOut's fields, in order; GET /scores selects just these
+SCORE_COLUMNS = (Attempt.id, Attempt.total, Attempt.correct, Attempt.category, Attempt.difficulty, Attempt.verified)
+SCORE_FIELDS = [c.key for c in SCORE_COLUMNS]
+EXPORT_COLUMNS = (*SCORE_COLUMNS, Attempt.created_at)
+EXPORT_FIELDS = [c.key for c in EXPORT_COLUMNS]
+# Rows fetched from the cursor (and written to the client) per chunk
+EXPORT_BATCH = 500
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_or_create_user(db: Session, email: str) -> User:
-    u = db.query(User).filter(User.email == email).first()
-    if not u:
-        u = User(email=email)
-        db.add(u)
-        db.commit()
-        db.refresh(u)
-    return u
+def _row(body: SubmitIn, user_id: int) -> dict:
+    # The client did the scoring: it counts in the player's own summary, but not on the leaderboard
+    return {"total": body.total, "correct": body.correct, "category": body.category, "difficulty": body.difficulty, "user_id": user_id, "verified": False}
 
 @router.post("", response_model=ScoreOut)
-def submit_score(body: SubmitIn, current: str = Depends(get_current_user), db: Session = Depends(get_db)):
-    user = get_or_create_user(db, current)
-    a = Attempt(total=body.total, correct=body.correct, category=body.category, difficulty=body.difficulty, user_id=user.id)
-    db.add(a); db.commit(); db.refresh(a)
-    return ScoreOut(id=a.id, total=a.total, correct=a.correct, category=a.category, difficulty=a.difficulty)
+async def submit_score(body: SubmitIn, current: Principal = Depends(get_current_user)):
+    """Record a client-scored attempt. Quiz sessions (POST /quiz/sessions/{id}/finish) record verified ones."""
+    return (await committed(writer.submit([_row(body, current.id)])))[0]
+
+@router.post("/batch", response_model=List[ScoreOut])
+async def submit_scores(body: List[SubmitIn], current: Principal = Depends(get_current_user)):
+    """Save several attempts at once (e.g. queued while offline) with one bulk insert."""
+    if len(body) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH} attempts per batch")
+    return await committed(writer.submit([_row(b, current.id) for b in body]))
+
+def encode_cursor(a) -> str:
+    raw = json.dumps([a.created_at.isoformat(), a.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, id_ = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("", response_model=List[ScoreOut])
-def list_scores(current: str = Depends(get_current_user), db: Session = Depends(get_db)):
-    user = get_or_create_user(db, current)
-    items = db.query(Attempt).filter(Attempt.user_id == user.id).order_by(Attempt.created_at.desc()).all()
-    return [ScoreOut(id=i.id, total=i.total, correct=i.correct, category=i.category, difficulty=i.difficulty) for i in items]
+async def list_scores(
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    current: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Newest first, one page at a time. The next page's cursor is in the X-Next-Cursor header."""
+    not_modified = conditional(request, response, await user_etag(db, current.id, limit, cursor, category, difficulty))
+    if not_modified:
+        return not_modified
+    stmt = select(*SCORE_COLUMNS, Attempt.created_at).where(Attempt.user_id == current.id)
+    if category is not None:
+        stmt = stmt.where(Attempt.category == category)
+    if difficulty is not None:
+        stmt = stmt.where(Attempt.difficulty == difficulty)
+    if cursor:
+        created_at, id_ = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            Attempt.created_at < created_at,
+            and_(Attempt.created_at == created_at, Attempt.id < id_),
+        ))
+    # Fetch one extra row to know whether there is a next page
+    rows = (await db.execute(stmt.order_by(Attempt.created_at.desc(), Attempt.id.desc()).limit(limit + 1))).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1])
+    return JSONResponse(records(rows, SCORE_FIELDS), headers=response.headers)
+
+async def _export_batches(user_id: int):
+    """The user's attempts, oldest first, EXPORT_BATCH rows at a time from a server-side cursor."""
+    # Own session: the stream outlives the request's dependencies
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(*EXPORT_COLUMNS)
+            .where(Attempt.user_id == user_id)
+            .order_by(Attempt.created_at, Attempt.id)
+            .execution_options(yield_per=EXPORT_BATCH)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+def _ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(r) + b"\n" for r in records(rows, EXPORT_FIELDS))
+
+def _csv(rows, header: bool = False) -> str:
+    out = io.StringIO()
+    w = csv.writer(out)
+    if header:
+        w.writerow(EXPORT_FIELDS)
+    w.writerows((*r[:-1], r[-1].isoformat()) for r in rows)
+    return out.getvalue()
+
+@router.get("/export")
+async def export_scores(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    current: Principal = Depends(get_current_user),
+):
+    """Full history as NDJSON or CSV, streamed in constant memory however long it is."""
+    async def body():
+        if fmt == "csv":
+            yield _csv([], header=True)
+        async for rows in _export_batches(current.id):
+            yield _ndjson(rows) if fmt == "ndjson" else _csv(rows)
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson" if fmt == "ndjson" else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="scores.{fmt}"'},
+    )
+
+def _stats(r: ScoreRollup, verified: bool = False) -> StatsOut:
+    attempts, total, correct = (r.verified_attempts, r.verified_total, r.verified_correct) if verified else (r.attempts, r.total, r.correct)
+    return StatsOut(
+        category=r.category, difficulty=r.difficulty, attempts=attempts, total=total, correct=correct,
+        accuracy=round(correct / total, 4) if total else 0.0,
+    )
+
+@router.get("/summary", response_model=SummaryOut)
+async def summary(
+    request: Request,
+    response: Response,
+    current: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Totals and accuracy of all the user's attempts overall, per category, per difficulty and per (category, difficulty)."""
+    not_modified = conditional(request, response, await user_etag(db, current.id, "summary"))
+    if not_modified:
+        return not_modified
+    out = SummaryOut()
+    for r in await db.scalars(select(ScoreRollup).where(ScoreRollup.user_id == current.id)):
+        if r.category == ALL and r.difficulty == ALL:
+            out.overall = _stats(r)
+        elif r.difficulty == ALL:
+            out.by_category.append(_stats(r))
+        elif r.category == ALL:
+            out.by_difficulty.append(_stats(r))
+        else:
+            out.by_category_difficulty.append(_stats(r))
+    return out
+
+@router.get("/leaderboard", response_model=List[LeaderboardEntry])
+async def leaderboard(
+    category: str = ALL,
+    difficulty: str = ALL,
+    limit: int = Query(10, ge=1, le=100),
+    current: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Top users by correct answers in verified attempts, globally or within a category and/or difficulty."""
+    rows = (await db.execute(
+        select(ScoreRollup, User.name)
+        .join(User, User.id == ScoreRollup.user_id)
+        .where(ScoreRollup.category == category, ScoreRollup.difficulty == difficulty, ScoreRollup.verified_attempts > 0)
+        .order_by(ScoreRollup.verified_correct.desc(), ScoreRollup.verified_total.asc(), ScoreRollup.user_id.asc())
+        .limit(limit)
+    )).all()
+    return [
+        LeaderboardEntry(rank=rank, name=name or f"Player {r.user_id}", **_stats(r, verified=True).model_dump(exclude={"category", "difficulty"}))
+        for rank, (r, name) in enumerate(rows, start=1)
+    ]
@@ -0,0 +1,113 @@
+import asyncio, logging, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    stored_at: float
+
+
+class TTLCache:
+    """Small in-process cache for upstream lookups.
+
+    - fresh for `ttl` seconds
+    - for another `swr` seconds the stale value is served while one background
+      refresh runs (stale-while-revalidate)
+    - if a load fails, any value younger than `stale_if_error` is served instead
+    - concurrent misses for the same key share a single load (singleflight)
+    - with `maxsize`, the least recently used entry is evicted once full
+    """
+
+    def __init__(self, ttl: float, swr: float = 0, stale_if_error: float = 24 * 60 * 60, maxsize: Optional[int] = None):
+        self.ttl = ttl
+        self.swr = swr
+        self.stale_if_error = stale_if_error
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.load_errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "load_errors": self.load_errors,
+            "size": len(self._data),
+        }
+
+    def get(self, key: Hashable) -> Any:
+        """Fresh value for `key`, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and time.monotonic() - entry.stored_at < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = _Entry(value, time.monotonic())
+            self._data.move_to_end(key)
+            if self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._data.get(key)
+        age = time.monotonic() - entry.stored_at if entry else None
+        if entry and age < self.ttl:
+            self.hits += 1
+            return entry.value
+        if entry and age < self.ttl + self.swr:
+            self.stale_hits += 1
+            if key not in self._inflight:
+                self._start_load(key, loader)
+            return entry.value
+
+        self.misses += 1
+        fut = self._inflight.get(key) or self._start_load(key, loader)
+        try:
+            # shield: one cancelled waiter must not cancel the load for everyone else
+            return await asyncio.shield(fut)
+        except Exception:
+            if entry and time.monotonic() - entry.stored_at < self.stale_if_error:
+                return entry.value
+            raise
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        fut = asyncio.ensure_future(self._load(key, loader))
+        # background refreshes may fail with nobody awaiting them; errors are already logged
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = fut
+        return fut
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            self.set(key, value)
+            return value
+        except Exception as e:
+            self.load_errors += 1
+            log.warning("Cache load for %r failed: %s", key, e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,114 @@
+"""Negotiated response compression (brotli when installed, else gzip).
+
+Only text-like bodies of at least COMPRESS_MIN_SIZE bytes are compressed;
+small JSON responses cost more CPU to compress than they save on the wire.
+Streaming responses are compressed chunk by chunk and flushed after each
+chunk, so clients still see rows as they're produced.
+"""
+import os, zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # optional: `pip install brotli`
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = 6
+# Quality 4 is about gzip -6 speed with noticeably smaller output
+BROTLI_QUALITY = 4
+COMPRESSIBLE = (b"application/json", b"application/x-ndjson", b"text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._flush = self._c.flush
+            self._finish = self._c.finish
+            self._write = self._c.process
+        else:
+            # wbits 16+: gzip container
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush = lambda: self._c.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._c.flush
+            self._write = self._c.compress
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        return self._write(data) + (self._finish() if last else self._flush())
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware; the response start is held back until the first body chunk decides."""
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: Optional[dict] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                headers = dict(start["headers"])
+                content_type = headers.get(b"content-type", b"")
+                if (
+                    b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE)
+                    or (not more and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    return await send(message)
+                compressor = _Compressor(encoding)
+                out = compressor.chunk(body, last=not more)
+                raw = [(k, v) for k, v in start["headers"] if k not in (b"content-length", b"vary")]
+                vary = headers.get(b"vary")
+                raw.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+                raw.append((b"content-encoding", encoding.encode()))
+                if not more:
+                    raw.append((b"content-length", str(len(out)).encode()))
+                await send({**start, "headers": raw})
+                return await send({"type": "http.response.body", "body": out, "more_body": more})
+            await send({"type": "http.response.body", "body": compressor.chunk(body, last=not more), "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+        # Responses without a body (e.g. some 204/304s) never hit the wrapper's body branch
+        if start is not None and compressor is None and not passthrough:
+            await send(start)
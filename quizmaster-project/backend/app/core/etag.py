@@ -0,0 +1,56 @@
+"""Conditional GETs for per-user resources.
+
+Each user row carries a `data_version` that is bumped whenever their profile
+or scores change. An ETag built from (user id, version, request params)
+changes exactly when the response could, so a matching If-None-Match can be
+answered with 304 after a single primary-key lookup.
+"""
+import hashlib
+from typing import Optional
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import User
+
+# Clients may keep a copy but must revalidate it every time
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(user_id: int, version: int, *params) -> str:
+    digest = hashlib.blake2s(repr(params).encode(), digest_size=6).hexdigest()
+    # Weak: the same representation may be sent compressed or not
+    return f'W/"{user_id}.{version}.{digest}"'
+
+
+async def user_etag(db: AsyncSession, user_id: int, *params) -> str:
+    """Read the version *before* loading the data it describes.
+
+    If a write lands in between, the response is tagged with the older
+    version and simply gets refetched next time; never the other way round.
+    """
+    version: Optional[int] = await db.scalar(select(User.data_version).where(User.id == user_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return make_etag(user_id, version, *params)
+
+
+def bump(user_ids):
+    """UPDATE that marks these users' cached responses stale; run it in the writing transaction."""
+    return update(User).where(User.id.in_(user_ids)).values(data_version=User.data_version + 1)
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Set the caching headers; return a 304 to send instead if the client's copy is current."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
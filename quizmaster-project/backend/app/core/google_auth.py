@@ -0,0 +1,135 @@
+import os, re, logging, threading, time
+from typing import Optional
+from app.core.metrics import observe_upstream
+
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+# Used when Google doesn't send a max-age
+DEFAULT_MAX_AGE = 60 * 60
+# Start a background refresh this long before the cached certs expire
+REFRESH_MARGIN = 5 * 60
+# Tokens naming a key we don't have force a refetch, at most this often: anyone
+# can mint such a token, and each one would otherwise cost a request to Google
+MIN_FORCED_REFRESH = 60
+
+log = logging.getLogger(__name__)
+
+
+def _max_age(cache_control: str) -> int:
+    m = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(m.group(1)) if m else DEFAULT_MAX_AGE
+
+
+class CertsUnavailable(Exception):
+    """Google's signing certs couldn't be fetched; sign-in can't be checked right now."""
+
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens against cached signing certs.
+
+    The certs are kept in memory for as long as Google's Cache-Control allows
+    and refreshed in the background shortly before they expire, so a normal
+    sign-in does no network I/O. One pooled requests.Session, created on the
+    first fetch, is reused for every fetch after that.
+    """
+
+    def __init__(
+        self,
+        client_id: Optional[str] = GOOGLE_CLIENT_ID,
+        certs_url: str = GOOGLE_CERTS_URL,
+        session: Optional["requests.Session"] = None,
+        refresh_margin: float = REFRESH_MARGIN,
+        min_forced_refresh: float = MIN_FORCED_REFRESH,
+    ):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.refresh_margin = refresh_margin
+        self.min_forced_refresh = min_forced_refresh
+        self._session = session
+        self._certs: dict[str, str] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self._forced_at = float("-inf")
+        self.fetches = 0
+
+    def _fetch(self):
+        # Imported here: most processes never see a Google sign-in
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+        started = time.perf_counter()
+        try:
+            r = self._session.get(self.certs_url, timeout=5)
+        except requests.RequestException as e:
+            observe_upstream("google_certs", started, error=type(e).__name__)
+            raise CertsUnavailable(f"Fetching Google certs failed: {e}") from e
+        observe_upstream("google_certs", started, r.status_code)
+        try:
+            r.raise_for_status()
+            certs = r.json()
+        except (requests.RequestException, ValueError) as e:
+            raise CertsUnavailable(f"Bad response for Google certs: {e}") from e
+        with self._lock:
+            self._certs = certs
+            self._expires_at = time.monotonic() + _max_age(r.headers.get("Cache-Control"))
+            self.fetches += 1
+
+    def _background_refresh(self):
+        try:
+            self._fetch()
+        except Exception as e:
+            log.warning("Refreshing Google certs failed: %s", e)
+        finally:
+            self._refreshing = False
+
+    def _forced_refresh(self) -> dict[str, str]:
+        with self._fetch_lock:
+            # Counted before fetching, so a failing endpoint is retried no faster either.
+            # Concurrent callers that waited for the lock see the fetch just made.
+            if time.monotonic() - self._forced_at >= self.min_forced_refresh:
+                self._forced_at = time.monotonic()
+                self._fetch()
+        return self._certs
+
+    def certs(self, force: bool = False) -> dict[str, str]:
+        if force:
+            return self._forced_refresh()
+        remaining = self._expires_at - time.monotonic()
+        if not self._certs or remaining <= 0:
+            seen = self.fetches
+            with self._fetch_lock:
+                # Someone else may have fetched while we waited for the lock
+                if self.fetches == seen:
+                    self._fetch()
+        elif remaining < self.refresh_margin and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._background_refresh, name="google-certs-refresh", daemon=True).start()
+        return self._certs
+
+    def verify(self, token: str) -> dict:
+        """Return the token's claims, or raise ValueError (bad token) or CertsUnavailable."""
+        # Imported lazily: only Google sign-ins need it
+        from google.auth import jwt as google_jwt
+
+        try:
+            claims = google_jwt.decode(token, certs=self.certs(), audience=self.client_id, clock_skew_in_seconds=10)
+        except ValueError as e:
+            if "Certificate for key id" not in str(e):
+                raise
+            # Google rotated its keys before our copy expired (or the kid is made up:
+            # then this is throttled, and the decode fails as an unknown key again)
+            claims = google_jwt.decode(token, certs=self.certs(force=True), audience=self.client_id, clock_skew_in_seconds=10)
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+        return claims
+
+
+google_verifier = GoogleTokenVerifier()
+
+
+def get_google_verifier() -> GoogleTokenVerifier:
+    return google_verifier
@@ -0,0 +1,162 @@
+import os, asyncio, threading, time
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+
+# Changing rounds (or schemes) marks existing hashes as needing an update;
+# they get rehashed transparently on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# Requests allowed to wait for a worker before we start shedding load
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 4)))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+
+_pwd = None
+
+
+def pwd():
+    """The passlib context. Only the worker processes hash, so the API process never imports passlib."""
+    global _pwd
+    if _pwd is None:
+        from passlib.context import CryptContext
+        _pwd = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd
+
+
+# These run inside the worker processes, so they must stay module-level.
+# Each returns (result, seconds spent hashing) so queueing and CPU cost can be told apart.
+def _hash(password: str) -> tuple[str, float]:
+    start = time.perf_counter()
+    # bcrypt max size fix
+    return pwd().hash(password[:72]), time.perf_counter() - start
+
+def _verify_and_update(password: str, hashed: str) -> tuple[tuple[bool, Optional[str]], float]:
+    start = time.perf_counter()
+    return pwd().verify_and_update(password[:72], hashed), time.perf_counter() - start
+
+def _warm():
+    pwd()
+
+
+class _OpStats:
+    def __init__(self):
+        self.count = 0
+        self.rejected = 0
+        self.recent_wall: deque[float] = deque(maxlen=1000)
+        self.recent_cpu: deque[float] = deque(maxlen=1000)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "rejected": self.rejected,
+            "wall_ms": _percentiles(self.recent_wall),
+            "hash_ms": _percentiles(self.recent_cpu),
+        }
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": pick(1.0)}
+
+
+class PasswordHasher:
+    """bcrypt on a dedicated process pool with admission control.
+
+    Hashing never runs on the request threadpool or event loop. At most
+    `max_pending` operations may be queued or running; beyond that callers get
+    a 503 straight away instead of piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING, timeout: float = HASH_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = {"hash": _OpStats(), "verify": _OpStats()}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that already runs threads is not safe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _submit(self, op: str, fn, *args) -> Future:
+        stats = self._stats[op]
+        with self._lock:
+            if self._pending >= self.max_pending:
+                stats.rejected += 1
+                raise HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+            self._pending += 1
+            pool = self._executor()
+        start = time.perf_counter()
+        try:
+            fut = pool.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        def done(f: Future):
+            with self._lock:
+                self._pending -= 1
+            if not f.cancelled() and f.exception() is None:
+                stats.count += 1
+                stats.recent_wall.append(time.perf_counter() - start)
+                stats.recent_cpu.append(f.result()[1])
+
+        fut.add_done_callback(done)
+        return fut
+
+    def _wait(self, fut: Future):
+        try:
+            return fut.result(timeout=self.timeout)[0]
+        except TimeoutError:
+            raise HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+
+    async def _await(self, fut: Future):
+        try:
+            return (await asyncio.wait_for(asyncio.wrap_future(fut), self.timeout))[0]
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+
+    def hash(self, password: str) -> str:
+        return self._wait(self._submit("hash", _hash, password))
+
+    def verify_and_update(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """(matches, new_hash); new_hash is set when the stored hash uses outdated parameters."""
+        return self._wait(self._submit("verify", _verify_and_update, password, hashed))
+
+    async def ahash(self, password: str) -> str:
+        return await self._await(self._submit("hash", _hash, password))
+
+    async def averify_and_update(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        return await self._await(self._submit("verify", _verify_and_update, password, hashed))
+
+    def warm(self):
+        """Start the workers (and their passlib import) now rather than on the first login."""
+        for _ in range(self.workers):
+            self._executor().submit(_warm)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            **{op: s.snapshot() for op, s in self._stats.items()},
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,296 @@
+"""Minimal Prometheus instrumentation, cheap enough to leave on in production.
+
+Metrics are plain in-process counters guarded by a lock; /metrics renders
+them in the Prometheus text format. Per-request context (route and DB
+stats) lives in a contextvar set by MetricsMiddleware.
+"""
+import threading, time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Pass `collect` to read the value(s) at scrape time, e.g. from counters kept elsewhere."""
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=(), collect: Optional[Callable[[], dict]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.collect = collect
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self):
+        if self.collect is not None:
+            try:
+                self._values = dict(self.collect())
+            except Exception:
+                # e.g. no running event loop; report nothing rather than failing the scrape
+                return []
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in list(self._values.items())]
+
+
+class Gauge(Counter):
+    """Settable gauge; pass `collect` to compute the value(s) at scrape time instead."""
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # one slot per bucket, then +Inf, sum
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def count(self, *labels) -> int:
+        counts = self._values.get(labels)
+        return sum(counts[:-1]) if counts else 0
+
+    def _samples(self):
+        out = []
+        for labels, counts in list(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts[:-1]):
+                cumulative += n
+                le = 'le="%s"' % bound
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {counts[-1]}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[_Metric] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for m in self.metrics for line in m.render()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status")))
+http_latency = registry.register(Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_in_flight = registry.register(Gauge("http_requests_in_flight", "HTTP requests currently being handled"))
+
+db_queries = registry.register(Counter("db_queries_total", "SQL statements executed", ("engine",)))
+db_query_latency = registry.register(Histogram("db_query_duration_seconds", "SQL statement latency", ("engine",)))
+db_queries_per_request = registry.register(Histogram("db_queries_per_request", "SQL statements per HTTP request", ("route",), COUNT_BUCKETS))
+db_time_per_request = registry.register(Histogram("db_time_per_request_seconds", "Time spent in SQL per HTTP request", ("route",)))
+db_pool_checkouts = registry.register(Counter("db_pool_checkouts_total", "Connections checked out of the pool", ("engine",)))
+
+_engines: dict = {}
+
+
+def _threadpool_tokens() -> dict:
+    import anyio.to_thread
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {("borrowed",): limiter.borrowed_tokens, ("total",): limiter.total_tokens}
+
+
+threadpool_tokens = registry.register(Gauge(
+    "threadpool_tokens", "Starlette threadpool slots (borrowed == total means saturated)", ("state",), collect=_threadpool_tokens,
+))
+db_pool_checked_out = registry.register(Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ("engine",),
+    collect=lambda: {(name, ): e.pool.checkedout() for name, e in _engines.items() if hasattr(e.pool, "checkedout")},
+))
+
+# In-process caches (TTLCache) by name; they keep their own counters, read at scrape time
+_caches: dict = {}
+
+
+def watch_cache(name: str, cache):
+    _caches[name] = cache
+    return cache
+
+
+def _cache_stats(*fields: str) -> dict:
+    return {(name, field): c.stats()[field] for name, c in _caches.items() for field in fields}
+
+
+cache_lookups = registry.register(Counter(
+    "cache_lookups_total", "Cache lookups by outcome (stale_hits are served while refreshing)", ("cache", "result"),
+    collect=lambda: _cache_stats("hits", "stale_hits", "misses"),
+))
+cache_load_errors = registry.register(Counter(
+    "cache_load_errors_total", "Cache loads that failed", ("cache",),
+    collect=lambda: {(name,): c.stats()["load_errors"] for name, c in _caches.items()},
+))
+cache_entries = registry.register(Gauge(
+    "cache_entries", "Entries currently cached", ("cache",),
+    collect=lambda: {(name,): c.stats()["size"] for name, c in _caches.items()},
+))
+
+upstream_latency = registry.register(Histogram("upstream_request_duration_seconds", "Outbound HTTP latency", ("service", "status")))
+upstream_errors = registry.register(Counter("upstream_errors_total", "Outbound HTTP failures (transport errors and 4xx/5xx)", ("service", "reason")))
+
+
+@dataclass
+class RequestStats:
+    scope: dict
+    queries: int = 0
+    db_time: float = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_of(self.scope)
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def route_of(scope: dict) -> str:
+    """Route template for a handled request, e.g. /quiz/sessions/{session_id}.
+
+    Included routers keep their own (unprefixed) paths, so the template is
+    rebuilt from the request path and its matched path params. Requests that
+    matched nothing share one label to keep cardinality bounded.
+    """
+    if "endpoint" not in scope:
+        return "unmatched"
+    params = {str(v): k for k, v in scope.get("path_params", {}).items()}
+    return "/".join("{%s}" % params[s] if s in params else s for s in scope["path"].split("/"))
+
+
+def observe_upstream(service: str, started: float, status: Optional[int] = None, error: Optional[str] = None):
+    upstream_latency.observe(time.perf_counter() - started, service, status if status is not None else "error")
+    if error is not None:
+        upstream_errors.inc(service, error)
+    elif status is not None and status >= 400:
+        upstream_errors.inc(service, str(status))
+
+
+def instrument_engine(engine, name: str, on_statement: Optional[Callable] = None):
+    """Hook SQL timing and pool checkouts for one (sync) engine.
+
+    The one timing hook per engine: `on_statement(name, statement, parameters,
+    executemany, elapsed)` is handed every statement's duration as well (the
+    slow-query log).
+    """
+    from sqlalchemy import event
+
+    _engines[name] = engine
+
+    # One slot per connection: a connection runs one statement at a time
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        db_queries.inc(name)
+        db_query_latency.observe(elapsed, name)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+        if on_statement is not None:
+            on_statement(name, statement, parameters, executemany, elapsed)
+
+    # A failed statement never reaches after_cursor_execute
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            context.connection.info.pop("query_start", None)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        db_pool_checkouts.inc(name)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: per-route latency, status counts, in-flight requests and DB cost."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            current_request.reset(token)
+            route = stats.route
+            method = scope["method"]
+            http_requests.inc(method, route, status)
+            http_latency.observe(time.perf_counter() - start, method, route)
+            db_queries_per_request.observe(stats.queries, route)
+            db_time_per_request.observe(stats.db_time, route)
@@ -0,0 +1,250 @@
+"""Diagnostics for slow requests: a slow-query log and opt-in request profiles.
+
+Slow-query log: always on. Any SQL statement slower than SLOW_QUERY_MS is
+kept (statement, parameter types but never values, duration, route) in a
+bounded ring buffer, read through GET /admin/slow-queries.
+
+Request profiles: an admin sends `X-Profile: 1` (or `?profile=1`) together
+with X-Admin-Token. A thread then samples the request's stack every
+PROFILE_INTERVAL_MS until the response is sent. While the request is
+running on the event loop the sample is its real stack (SQLAlchemy,
+serialization, ...); while it's suspended it's the chain of awaits it is
+parked in, ending in `(await)` (bcrypt, opentdb, DB I/O). The response gets
+an X-Profile-Id header; the report is at GET /admin/profiles/{id}.
+"""
+import asyncio, itertools, logging, os, sys, threading, time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+from app.core.metrics import current_request
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+PROFILE_LOG_SIZE = int(os.getenv("PROFILE_LOG_SIZE", "20"))
+# Finer than the interpreter's 5ms switch interval buys little on CPU-bound stretches
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+MAX_STATEMENT = 2000
+TOP_FUNCTIONS = 20
+TOP_STACKS = 20
+
+ROOT = str(Path(__file__).resolve().parents[2]) + os.sep
+STDLIB = os.path.dirname(os.__file__) + os.sep
+
+log = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """The last `size` entries, newest first when read. Each entry gets an increasing id."""
+
+    def __init__(self, size: int):
+        self._entries: deque = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, entry: dict, id: Optional[int] = None):
+        entry = {"id": id if id is not None else self.next_id(), **entry}
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def get(self, id: int) -> Optional[dict]:
+        return next((e for e in self.entries() if e["id"] == id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = RingBuffer(SLOW_QUERY_LOG_SIZE)
+profiles = RingBuffer(PROFILE_LOG_SIZE)
+
+
+def param_shape(parameters, executemany: bool = False) -> str:
+    """Types of the bound parameters, e.g. `(int, str)`; values are never kept."""
+    # insertmanyvalues batches arrive flagged executemany but as one flat row
+    if executemany and parameters and isinstance(parameters[0], (tuple, list, dict)):
+        return f"{len(parameters)} x {param_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        items = [f"{k}: {type(v).__name__}" for k, v in parameters.items()]
+        opening, closing = "{", "}"
+    else:
+        items = [type(v).__name__ for v in parameters or ()]
+        opening, closing = "(", ")"
+    if len(items) > 10:
+        items = items[:10] + [f"... {len(items) - 10} more"]
+    return opening + ", ".join(items) + closing
+
+
+def log_slow_query(engine: str, statement: str, parameters, executemany: bool, elapsed: float):
+    """Keep the statement if it took SLOW_QUERY_MS or more; instrument_engine's on_statement hook."""
+    # Runs inside the statement's execution: a bug here must never fail the query
+    try:
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < SLOW_QUERY_MS:
+            return
+        stats = current_request.get()
+        slow_queries.add({
+            "at": time.time(),
+            "engine": engine,
+            "duration_ms": round(elapsed_ms, 2),
+            "statement": " ".join(statement.split())[:MAX_STATEMENT],
+            "params": param_shape(parameters, executemany),
+            # None for work outside a request, e.g. the score writer thread
+            "method": stats.scope["method"] if stats else None,
+            "route": stats.route if stats else None,
+        })
+    except Exception:
+        log.exception("Recording a slow query failed")
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(ROOT):
+        path = path[len(ROOT):]
+    elif path.startswith(STDLIB):
+        path = path[len(STDLIB):]
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+
+
+def _await_chain(coro) -> list:
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+class Sampler:
+    """Samples one request task from a background thread (sys._current_frames)."""
+
+    def __init__(self, task: asyncio.Task, top, interval: float):
+        # `top` is the profiling middleware's own frame; stacks are cut there
+        self.task, self.top, self.interval = task, top, interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            stack = self._sample()
+            if stack:
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def _sample(self) -> Optional[tuple]:
+        frame = sys._current_frames().get(self.thread_id)
+        running = []
+        while frame is not None:
+            running.append(frame)
+            if frame is self.top:
+                return tuple(_label(f) for f in reversed(running))
+            frame = frame.f_back
+        # Not on the loop thread right now: where is it waiting?
+        chain = _await_chain(self.task.get_coro())
+        for i, f in enumerate(chain):
+            if f is self.top:
+                return tuple(_label(f) for f in chain[i:]) + ("(await)",)
+        return None
+
+    def report(self) -> dict:
+        self_counts, totals = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            self_counts[stack[-1]] += n
+            for label in set(stack):
+                totals[label] += n
+        pct = lambda n: round(100 * n / self.samples, 1) if self.samples else 0.0
+        ours = [(label, n) for label, n in totals.most_common() if " (app/" in label and "Middleware." not in label]
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            # Where the samples landed: a hot function, or (await) for time spent suspended
+            "leaves": [{"function": label, "self_pct": pct(n)} for label, n in self_counts.most_common(TOP_FUNCTIONS)],
+            # Our own code (app/..., minus the middlewares every request passes through), by share of samples on the stack
+            "functions": [
+                {"function": label, "total_pct": pct(n), "self_pct": pct(self_counts[label])}
+                for label, n in ours[:TOP_FUNCTIONS]
+            ],
+            # Folded stacks, root first: paste into flamegraph.pl or speedscope
+            "stacks": [{"stack": ";".join(s), "samples": n} for s, n in self.stacks.most_common(TOP_STACKS)],
+        }
+
+
+def wants_profile(scope) -> bool:
+    header = next((v for k, v in scope["headers"] if k == b"x-profile"), None)
+    if header is not None:
+        return header.strip() in (b"1", b"true")
+    return parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile", [""])[-1] in ("1", "true")
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware; profiles the requests an admin asks it to, and only those.
+
+    `authorize` gets the X-Admin-Token value. Requests that ask without a
+    valid token are served normally, unprofiled.
+    """
+
+    def __init__(self, app, authorize: Callable[[Optional[str]], bool], interval_ms: float = PROFILE_INTERVAL_MS):
+        self.app = app
+        self.authorize = authorize
+        self.interval = interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not wants_profile(scope):
+            return await self.app(scope, receive, send)
+        token = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-admin-token"), None)
+        if not self.authorize(token):
+            return await self.app(scope, receive, send)
+
+        profile_id = profiles.next_id()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message["headers"], (b"x-profile-id", str(profile_id).encode())]}
+            await send(message)
+
+        sampler = Sampler(asyncio.current_task(), sys._getframe(), self.interval)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - start
+            stats = current_request.get()
+            profiles.add({
+                "at": time.time(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": stats.route if stats else None,
+                "status": status,
+                "duration_ms": round(duration * 1000, 2),
+                "db_queries": stats.queries if stats else None,
+                "db_time_ms": round(stats.db_time * 1000, 2) if stats else None,
+                **sampler.report(),
+            }, id=profile_id)
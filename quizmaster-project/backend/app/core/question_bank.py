@@ -0,0 +1,184 @@
+import os, html, hashlib, logging, asyncio, contextlib, time
+from typing import Optional
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Question
+from app.core.upstream import TriviaClient
+from app.db.session import AsyncSessionLocal
+
+# How many questions we try to keep per (category, difficulty) bucket
+BANK_TARGET = int(os.getenv("QUESTION_BANK_TARGET", "100"))
+# opentdb caps a single call at 50 questions and ~1 call per 5s per IP
+BATCH_SIZE = 50
+UPSTREAM_INTERVAL = float(os.getenv("QUESTION_BANK_INTERVAL", "5"))
+# Once opentdb has nothing new for a bucket, leave it alone for a while
+EXHAUSTED_TTL = 6 * 60 * 60
+
+# opentdb response codes
+OK, NO_RESULTS, INVALID_PARAM, TOKEN_NOT_FOUND, TOKEN_EMPTY, RATE_LIMIT = range(6)
+
+log = logging.getLogger(__name__)
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+def parse_results(results: list) -> list[dict]:
+    """Unescape opentdb results once, at ingest time."""
+    return [
+        {
+            "question": html.unescape(q["question"]),
+            "correct_answer": html.unescape(q["correct_answer"]),
+            "incorrect_answers": [html.unescape(a) for a in q["incorrect_answers"]],
+        }
+        for q in results
+    ]
+
+
+def insert_new(dialect: str):
+    """INSERT into questions that skips rows whose fingerprint is already banked."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(Question).on_conflict_do_nothing(index_elements=[Question.fingerprint])
+
+
+async def store_questions(db: AsyncSession, category: int, difficulty: str, items: list[dict]) -> int:
+    """Insert questions we don't already have. Returns how many were new."""
+    by_fp = {fingerprint(i["question"]): i for i in items}
+    if not by_fp:
+        return 0
+    rows = [{"category": category, "difficulty": difficulty, "fingerprint": fp, **item} for fp, item in by_fp.items()]
+    # The conflict clause, not a lookup first: the refiller or another request may bank the same questions meanwhile
+    inserted = await db.execute(insert_new(db.bind.dialect.name).returning(Question.id), rows)
+    new = len(inserted.all())
+    await db.commit()
+    return new
+
+
+async def bucket_size(db: AsyncSession, category: int, difficulty: str) -> int:
+    return await db.scalar(
+        select(func.count(Question.id)).where(Question.category == category, Question.difficulty == difficulty)
+    )
+
+
+async def sample(db: AsyncSession, category: int, difficulty: str, amount: int) -> list[Question]:
+    """Pick `amount` random questions from one bucket (single indexed query)."""
+    stmt = (
+        select(Question)
+        .where(Question.category == category, Question.difficulty == difficulty)
+        .order_by(func.random())
+        .limit(amount)
+    )
+    return list(await db.scalars(stmt))
+
+
+class QuestionBankRefiller:
+    """Background task that tops up buckets from opentdb in bulk.
+
+    Buckets are queued with `request()`; a single task drains the queue so we
+    never call opentdb faster than UPSTREAM_INTERVAL. A session token keeps
+    opentdb from handing us questions we've already seen.
+    """
+
+    def __init__(self, target: int = BANK_TARGET, interval: float = UPSTREAM_INTERVAL):
+        self.target = target
+        self.interval = interval
+        self._queue: Optional["asyncio.Queue[tuple[int, str]]"] = None
+        self._pending: set[tuple[int, str]] = set()
+        self._exhausted: dict[tuple[int, str], float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._trivia: Optional[TriviaClient] = None
+        self._token: Optional[str] = None
+        self._last_call = 0.0
+
+    def start(self, trivia: TriviaClient):
+        if self._task and not self._task.done():
+            return
+        self._trivia = trivia
+        self._queue = asyncio.Queue()
+        self._pending.clear()
+        self._task = asyncio.create_task(self._run(), name="question-bank-refiller")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        self._task = None
+        self._queue = None
+
+    def request(self, category: int, difficulty: str):
+        bucket = (category, difficulty)
+        if self._queue is None or bucket in self._pending or self._exhausted.get(bucket, 0) > time.monotonic():
+            return
+        self._pending.add(bucket)
+        self._queue.put_nowait(bucket)
+
+    async def _run(self):
+        while True:
+            bucket = await self._queue.get()
+            try:
+                await self._fill(*bucket)
+            except Exception:
+                log.exception("Refilling question bucket %s failed", bucket)
+            finally:
+                self._pending.discard(bucket)
+
+    async def _fill(self, category: int, difficulty: str):
+        amount = BATCH_SIZE
+        async with AsyncSessionLocal() as db:
+            while True:
+                missing = self.target - await bucket_size(db, category, difficulty)
+                if missing <= 0:
+                    return
+                code, results = await self._fetch(category, difficulty, min(amount, missing))
+                if code == RATE_LIMIT:
+                    continue
+                if code == TOKEN_NOT_FOUND:
+                    self._token = None
+                    continue
+                if code == NO_RESULTS and amount > 1:
+                    # Small categories can't serve a full batch; ask for less
+                    amount //= 2
+                    continue
+                if code != OK or await store_questions(db, category, difficulty, parse_results(results)) == 0:
+                    self._exhausted[(category, difficulty)] = time.monotonic() + EXHAUSTED_TTL
+                    return
+
+    async def _throttle(self):
+        wait = self._last_call + self.interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_call = time.monotonic()
+
+    async def _session_token(self) -> Optional[str]:
+        if self._token is None:
+            await self._throttle()
+            data = await self._trivia.get_json("/api_token.php", params={"command": "request"})
+            self._token = data.get("token")
+        return self._token
+
+    async def _fetch(self, category: int, difficulty: str, amount: int) -> tuple[int, list]:
+        params = {"amount": amount, "type": "multiple", "category": category, "difficulty": difficulty}
+        token = await self._session_token()
+        if token:
+            params["token"] = token
+        await self._throttle()
+        try:
+            data = await self._trivia.get_json("/api.php", params=params)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                return RATE_LIMIT, []
+            raise
+        return data.get("response_code", OK), data.get("results") or []
+
+
+refiller = QuestionBankRefiller()
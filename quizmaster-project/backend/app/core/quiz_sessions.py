@@ -0,0 +1,137 @@
+"""Server-side quiz sessions.
+
+/quiz/start stores the question set under a random session id, so a reload
+or reconnect resumes the same quiz instead of fetching new questions, and
+the score is computed here from the recorded answers rather than trusted
+from the client.
+
+Sessions live in a TTLCache (expiry + LRU eviction) in this process. Set
+QUIZ_SESSION_DB to a file path to keep them in a shared SQLite file instead,
+so any worker can serve any session; that file is then the source of truth.
+"""
+import os, json, random, secrets, sqlite3, threading, time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import TTLCache
+
+QUIZ_SESSION_TTL = int(os.getenv("QUIZ_SESSION_TTL", str(2 * 60 * 60)))
+QUIZ_SESSION_MAX = int(os.getenv("QUIZ_SESSION_MAX", "10000"))
+QUIZ_SESSION_DB = os.getenv("QUIZ_SESSION_DB")
+
+
+@dataclass(slots=True)
+class QuizSession:
+    id: str
+    user_id: int
+    # None for quizzes built from a keyword search
+    category: Optional[int]
+    difficulty: str
+    # (question, correct_answer, options in the order the player sees them)
+    questions: list[tuple[str, str, tuple[str, ...]]]
+    answers: list[Optional[str]] = field(default_factory=list)
+    attempt_id: Optional[int] = None
+    # Bumped on every save; the SQLite store uses it to refuse lost updates
+    version: int = 0
+
+    @property
+    def correct(self) -> int:
+        return sum(a == q[1] for q, a in zip(self.questions, self.answers))
+
+    @property
+    def answered(self) -> int:
+        return sum(a is not None for a in self.answers)
+
+    def next_index(self) -> Optional[int]:
+        return next((i for i, a in enumerate(self.answers) if a is None), None)
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, raw: str) -> "QuizSession":
+        data = json.loads(raw)
+        data["questions"] = [(q, c, tuple(o)) for q, c, o in data["questions"]]
+        return cls(**data)
+
+
+def new_session(user_id: int, category: Optional[int], difficulty: str, items: list[dict]) -> QuizSession:
+    questions = []
+    for i in items:
+        options = [i["correct_answer"], *i["incorrect_answers"]]
+        random.shuffle(options)
+        questions.append((i["question"], i["correct_answer"], tuple(options)))
+    return QuizSession(
+        id=secrets.token_urlsafe(16), user_id=user_id, category=category, difficulty=difficulty,
+        questions=questions, answers=[None] * len(questions),
+    )
+
+
+class SessionConflict(Exception):
+    """Someone else saved the session since it was loaded."""
+
+
+class SessionStore:
+    def __init__(self, ttl: float = QUIZ_SESSION_TTL, maxsize: int = QUIZ_SESSION_MAX, path: Optional[str] = QUIZ_SESSION_DB):
+        self.ttl = ttl
+        self.path = path
+        self._memory = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app does no I/O
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_sessions "
+                "(id TEXT PRIMARY KEY, version INTEGER NOT NULL, expires_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load(self, session_id: str) -> Optional[QuizSession]:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT data FROM quiz_sessions WHERE id = ? AND expires_at > ?", (session_id, time.time())
+            ).fetchone()
+        return QuizSession.loads(row[0]) if row else None
+
+    def _store(self, s: QuizSession, expected: int):
+        with self._lock:
+            db = self._db()
+            cur = db.execute(
+                "INSERT INTO quiz_sessions (id, version, expires_at, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET version = excluded.version, expires_at = excluded.expires_at, data = excluded.data "
+                "WHERE quiz_sessions.version = ?",
+                (s.id, s.version, time.time() + self.ttl, s.dumps(), expected),
+            )
+            if cur.rowcount == 0:
+                raise SessionConflict(s.id)
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                db.execute("DELETE FROM quiz_sessions WHERE expires_at <= ?", (time.time(),))
+
+    async def get(self, session_id: str) -> Optional[QuizSession]:
+        if self.path:
+            return await run_in_threadpool(self._load, session_id)
+        return self._memory.get(session_id)
+
+    async def save(self, s: QuizSession):
+        """Store `s`; raises SessionConflict if it changed since it was loaded."""
+        expected = s.version
+        s.version += 1
+        if self.path:
+            try:
+                await run_in_threadpool(self._store, s, expected)
+            except SessionConflict:
+                s.version = expected
+                raise
+        else:
+            self._memory.set(s.id, s)
+
+
+sessions = SessionStore()
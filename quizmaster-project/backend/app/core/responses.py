@@ -0,0 +1,33 @@
+"""Fast path for large JSON list responses.
+
+Handlers on hot list endpoints select just the columns a schema needs and
+return `JSONResponse(records(rows, FIELDS))`: rows become plain dicts in one
+comprehension and orjson encodes them, with no per-row Pydantic model, no
+response validation pass and no intermediate encoder. The route's
+`response_model` is kept so the OpenAPI docs stay the same.
+"""
+from typing import Any, Iterable, Sequence
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class JSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+
+def records(rows: Iterable[Sequence], fields: Sequence[str]) -> list[dict]:
+    """Map result rows (or any tuples) to dicts keyed by `fields`, positionally.
+
+    Rows may carry extra trailing columns (e.g. a cursor key); they're dropped.
+    """
+    return [dict(zip(fields, row)) for row in rows]
@@ -1,32 +1,78 @@
 import os
+from dataclasses import dataclass
+from typing import Optional
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer
-from passlib.context import CryptContext
+from sqlalchemy import select
+from app.core.cache import TTLCache
+from app.core.hashing import hasher
+from app.core.metrics import watch_cache
+from app.db.models import User
+from app.db.session import AsyncSessionLocal
 
 SECRET = os.getenv("JWT_SECRET", "change-me")
 ALGO = "HS256"
 auth = HTTPBearer()
 
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# uid -> Principal. Bounded, and short enough that a token_version bump made
+# by another worker is picked up quickly.
+principal_cache = watch_cache("principals", TTLCache(ttl=int(os.getenv("PRINCIPAL_CACHE_TTL", "300")), maxsize=10_000))
 
-def hash_password(password: str) -> str:
-    # bcrypt max size fix
-    password = password[:72]
-    return pwd.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return pwd.verify(password[:72], hashed)
+@dataclass(frozen=True)
+class Principal:
+    """What handlers need to know about the caller, without loading a User."""
+    id: int
+    email: str
+    token_version: int
+
+
+async def hash_password(password: str) -> str:
+    return await hasher.ahash(password)
+
+async def verify_and_update_password(password: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """Check a password; also returns a fresh hash if `hashed` uses outdated parameters."""
+    return await hasher.averify_and_update(password, hashed)
 
 
 def create_access_token(data: dict, expires: timedelta = timedelta(hours=3)) -> str:
     to_encode = {**data, "exp": datetime.utcnow() + expires}
     return jwt.encode(to_encode, SECRET, algorithm=ALGO)
 
-def get_current_user(credentials=Depends(auth)) -> str:
+def create_user_token(user: User) -> str:
+    return create_access_token({"sub": user.email, "uid": user.id, "ver": user.token_version})
+
+def invalidate_principal(user_id: int):
+    principal_cache.invalidate(user_id)
+
+
+async def _load_principal(payload: dict):
+    async with AsyncSessionLocal() as db:
+        if "uid" in payload:
+            user = await db.get(User, int(payload["uid"]))
+        else:
+            # Tokens issued before uid was added only carry the email
+            user = await db.scalar(select(User).where(User.email == str(payload["sub"])))
+        if user is None:
+            return None
+        return Principal(id=user.id, email=user.email, token_version=user.token_version)
+
+async def get_current_user(credentials=Depends(auth)) -> Principal:
     try:
         payload = jwt.decode(credentials.credentials, SECRET, algorithms=[ALGO])
-        return str(payload["sub"])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    uid = payload.get("uid")
+    principal = principal_cache.get(uid) if uid is not None else None
+    if principal is None:
+        principal = await _load_principal(payload)
+        if principal is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        principal_cache.set(principal.id, principal)
+
+    if principal.token_version != payload.get("ver", 0):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return principal
@@ -0,0 +1,68 @@
+import os, asyncio, random, time
+from typing import Optional
+import httpx
+from fastapi import Request
+from app.core.metrics import observe_upstream
+
+BASE = os.getenv("EXTERNAL_API_BASE", "https://opentdb.com")
+# Upper bound on simultaneous calls to opentdb from this worker
+MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "5"))
+MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 1.0
+
+
+class TriviaClient:
+    """Shared async client for the trivia API.
+
+    One pooled httpx.AsyncClient (keep-alive) per app, a semaphore so a burst
+    of requests can't open unbounded upstream connections, and retries with
+    full jitter when the upstream answers 429.
+    """
+
+    def __init__(
+        self,
+        base: str = BASE,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_retries: int = MAX_RETRIES,
+        retry_base_delay: float = RETRY_BASE_DELAY,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base,
+            timeout=httpx.Timeout(10, connect=5),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+
+    async def get_json(self, path: str, params: Optional[dict] = None) -> dict:
+        attempt = 0
+        while True:
+            async with self._sem:
+                started = time.perf_counter()
+                try:
+                    r = await self._client.get(path, params=params)
+                except httpx.HTTPError as e:
+                    observe_upstream("opentdb", started, error=type(e).__name__)
+                    raise
+                observe_upstream("opentdb", started, r.status_code)
+            if r.status_code != 429 or attempt >= self.max_retries:
+                r.raise_for_status()
+                return r.json()
+            await asyncio.sleep(self._backoff(r, attempt))
+            attempt += 1
+
+    def _backoff(self, r: httpx.Response, attempt: int) -> float:
+        retry_after = r.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after) + random.uniform(0, self.retry_base_delay)
+        return random.uniform(0, self.retry_base_delay * 2 ** attempt)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def get_trivia(request: Request) -> TriviaClient:
+    return request.app.state.trivia
@@ -0,0 +1,115 @@
+"""Bulk-load a question dump into the question bank, offline.
+
+Takes opentdb-format questions, either a saved API response
+({"results": [...]}), a plain JSON list or NDJSON (one question per line):
+
+    python -m app.db.import_questions dump.json more.ndjson
+    python -m app.db.import_questions --category 18 --difficulty hard computers.json
+
+Questions are unescaped like live fetches and deduped on their normalized text
+(the fingerprint), both within the files and against what's already banked, so
+re-running an import is harmless. Rows go in with one multi-row INSERT per
+batch; the search index is kept up to date by its triggers.
+"""
+import argparse, html, json
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.question_bank import fingerprint, insert_new, parse_results
+from app.db.models import Question
+
+BATCH_SIZE = 1000
+
+# opentdb category names as they appear in dumps, for files that mix categories
+CATEGORY_IDS = {
+    "General Knowledge": 9,
+    "Entertainment: Books": 10,
+    "Entertainment: Film": 11,
+    "Entertainment: Music": 12,
+    "Entertainment: Musicals & Theatres": 13,
+    "Entertainment: Television": 14,
+    "Entertainment: Video Games": 15,
+    "Entertainment: Board Games": 16,
+    "Science & Nature": 17,
+    "Science: Computers": 18,
+    "Science: Mathematics": 19,
+    "Mythology": 20,
+    "Sports": 21,
+    "Geography": 22,
+    "History": 23,
+    "Politics": 24,
+    "Art": 25,
+    "Celebrities": 26,
+    "Animals": 27,
+    "Vehicles": 28,
+    "Entertainment: Comics": 29,
+    "Science: Gadgets": 30,
+    "Entertainment: Japanese Anime & Manga": 31,
+    "Entertainment: Cartoon & Animations": 32,
+}
+
+
+def read_dump(path: Path) -> list[dict]:
+    text = path.read_text(encoding="utf-8")
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        return data.get("results") or []
+    return data if isinstance(data, list) else [data]
+
+
+def rows(raw: Iterable[dict], category: Optional[int] = None, difficulty: Optional[str] = None) -> tuple[list[dict], int]:
+    """Insertable rows, deduped, plus how many questions were skipped as unusable."""
+    by_fp, skipped = {}, 0
+    for q in raw:
+        try:
+            cat = category or CATEGORY_IDS[html.unescape(q["category"])]
+            diff = difficulty or q["difficulty"]
+            # True/false questions don't fit the bank's multiple-choice buckets
+            if q.get("type", "multiple") != "multiple":
+                raise ValueError(q["type"])
+            item = parse_results([q])[0]
+        except (KeyError, TypeError, ValueError):
+            skipped += 1
+            continue
+        by_fp.setdefault(fingerprint(item["question"]), {"category": cat, "difficulty": diff, **item})
+    return [{"fingerprint": fp, **row} for fp, row in by_fp.items()], skipped
+
+
+def batches(items: list, size: int) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def import_rows(db: Session, new: list[dict], batch_size: int = BATCH_SIZE) -> int:
+    """Insert in batches, one commit per batch; returns how many rows were actually new."""
+    count = select(func.count(Question.id))
+    before = db.scalar(count)
+    stmt = insert_new(db.get_bind().dialect.name)
+    for batch in batches(new, batch_size):
+        db.execute(stmt, batch)
+        db.commit()
+    return db.scalar(count) - before
+
+
+if __name__ == "__main__":
+    from app.db.schema import ensure_schema
+    from app.db.session import SessionLocal, init_engines
+
+    parser = argparse.ArgumentParser(prog="python -m app.db.import_questions")
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--category", type=int, help="opentdb category id for every question (default: from each question)")
+    parser.add_argument("--difficulty", choices=["easy", "medium", "hard"], help="default: from each question")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    raw = [q for path in args.files for q in read_dump(path)]
+    new, skipped = rows(raw, args.category, args.difficulty)
+    engine, _ = init_engines()
+    ensure_schema(engine)
+    with SessionLocal() as db:
+        added = import_rows(db, new, args.batch_size)
+    print(f"Read {len(raw)} questions: {added} new, {len(new) - added} already banked, {len(raw) - len(new) - skipped} duplicates, {skipped} skipped")
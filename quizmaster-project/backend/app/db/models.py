@@ -1,6 +1,6 @@
 from typing import Optional
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, ForeignKey, Integer, DateTime
+from sqlalchemy import Boolean, String, ForeignKey, Integer, DateTime, Text, JSON, Index, false
 from datetime import datetime
 
 
@@ -10,20 +10,32 @@ class Base(DeclarativeBase):
 
 class User(Base):
     __tablename__ = "users"
+    # Never reuse ids: tokens identify users by id
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
     password: Mapped[str] = mapped_column(String(255))
     # New: optional display name for settings page
     name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    # Bump to revoke every token issued so far
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Bumped whenever the profile or scores change; feeds the ETags on /auth/me and /scores
+    data_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # The database deletes a user's attempts and rollups (ON DELETE CASCADE);
+    # passive_deletes stops the ORM from loading them first
     attempts: Mapped[list["Attempt"]] = relationship(
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
+    rollups: Mapped[list["ScoreRollup"]] = relationship(cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Attempt(Base):
     __tablename__ = "attempts"
+    # Serves the per-user, newest-first keyset scan in GET /scores
+    __table_args__ = (Index("ix_attempts_user_created", "user_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     total: Mapped[int] = mapped_column(Integer)
@@ -31,5 +43,46 @@ class Attempt(Base):
     category: Mapped[str] = mapped_column(String(128))
     difficulty: Mapped[str] = mapped_column(String(32))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
-    user: Mapped[User] = relationship(back_populates="attempts")
\ No newline at end of file
+    # Scored by the server from a quiz session; client-reported scores are kept but don't count in rollups
+    verified: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    user: Mapped[User] = relationship(back_populates="attempts")
+
+
+class ScoreRollup(Base):
+    """Running totals per user and (category, difficulty), kept in step with attempts.
+
+    A "*" in category or difficulty means "all of them", so each attempt
+    touches four rows and every summary/leaderboard read is a plain lookup.
+    attempts/total/correct count every attempt (the player's own summary);
+    the verified_* columns only server-scored ones (the leaderboard).
+    """
+    __tablename__ = "score_rollups"
+    # Leaderboards: top users by verified correct answers within one (category, difficulty)
+    __table_args__ = (Index("ix_score_rollups_board", "category", "difficulty", "verified_correct"),)
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category: Mapped[str] = mapped_column(String(128), primary_key=True)
+    difficulty: Mapped[str] = mapped_column(String(32), primary_key=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    correct: Mapped[int] = mapped_column(Integer, default=0)
+    verified_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    verified_total: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    verified_correct: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+
+class Question(Base):
+    """Locally banked trivia question, stored already unescaped."""
+    __tablename__ = "questions"
+    __table_args__ = (Index("ix_questions_bucket", "category", "difficulty"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    category: Mapped[int] = mapped_column(Integer)
+    difficulty: Mapped[str] = mapped_column(String(32))
+    question: Mapped[str] = mapped_column(Text)
+    correct_answer: Mapped[str] = mapped_column(Text)
+    incorrect_answers: Mapped[list[str]] = mapped_column(JSON)
+    # sha1 of the normalized question text, used to dedupe across fetches
+    fingerprint: Mapped[str] = mapped_column(String(40), unique=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,105 @@
+"""Keeps score_rollups in step with attempts.
+
+Every attempt counts towards the player's own totals. The verified_*
+columns count only verified attempts (scored by the server from a quiz
+session): client-reported scores can't move the leaderboard.
+
+Backfill or repair existing data with:
+
+    python -m app.db.rollups rebuild
+"""
+import argparse
+from collections import defaultdict
+from typing import Iterable
+from sqlalchemy import case, delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+from app.db.models import Attempt, ScoreRollup
+
+ALL = "*"
+
+
+def _upsert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(ScoreRollup)
+
+
+def apply_attempts(db: Session, attempts: Iterable[Attempt]):
+    """Add attempts to the rollups inside the caller's transaction (no commit)."""
+    deltas = defaultdict(lambda: [0, 0, 0, 0, 0, 0])
+    for a in attempts:
+        counts = (1, a.total, a.correct) * 2 if a.verified else (1, a.total, a.correct, 0, 0, 0)
+        for category in (a.category, ALL):
+            for difficulty in (a.difficulty, ALL):
+                d = deltas[(a.user_id, category, difficulty)]
+                for i, n in enumerate(counts):
+                    d[i] += n
+    if not deltas:
+        return
+
+    stmt = _upsert(db)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ScoreRollup.user_id, ScoreRollup.category, ScoreRollup.difficulty],
+        set_={
+            "attempts": ScoreRollup.attempts + stmt.excluded.attempts,
+            "total": ScoreRollup.total + stmt.excluded.total,
+            "correct": ScoreRollup.correct + stmt.excluded.correct,
+            "verified_attempts": ScoreRollup.verified_attempts + stmt.excluded.verified_attempts,
+            "verified_total": ScoreRollup.verified_total + stmt.excluded.verified_total,
+            "verified_correct": ScoreRollup.verified_correct + stmt.excluded.verified_correct,
+        },
+    )
+    db.execute(stmt, [
+        {
+            "user_id": uid, "category": c, "difficulty": d, "attempts": n, "total": t, "correct": k,
+            "verified_attempts": vn, "verified_total": vt, "verified_correct": vk,
+        }
+        for (uid, c, d), (n, t, k, vn, vt, vk) in deltas.items()
+    ])
+
+
+def rebuild(db: Session):
+    """Recompute every rollup row from attempts in one transaction."""
+    db.execute(delete(ScoreRollup))
+    all_ = literal(ALL)
+    verified = lambda value: func.sum(case((Attempt.verified, value), else_=0))
+    for category, difficulty in (
+        (Attempt.category, Attempt.difficulty),
+        (Attempt.category, all_),
+        (all_, Attempt.difficulty),
+        (all_, all_),
+    ):
+        group_by = [Attempt.user_id] + [c for c in (category, difficulty) if c is not all_]
+        sel = select(
+            Attempt.user_id,
+            category,
+            difficulty,
+            func.count(Attempt.id),
+            func.sum(Attempt.total),
+            func.sum(Attempt.correct),
+            verified(1),
+            verified(Attempt.total),
+            verified(Attempt.correct),
+        ).group_by(*group_by)
+        db.execute(insert(ScoreRollup).from_select(
+            ["user_id", "category", "difficulty", "attempts", "total", "correct", "verified_attempts", "verified_total", "verified_correct"],
+            sel,
+        ))
+    db.commit()
+
+
+if __name__ == "__main__":
+    from app.db.schema import ensure_schema
+    from app.db.session import SessionLocal, init_engines
+
+    parser = argparse.ArgumentParser(prog="python -m app.db.rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    engine, _ = init_engines()
+    ensure_schema(engine)
+    with SessionLocal() as db:
+        rebuild(db)
+        print(f"Rebuilt {db.scalar(select(func.count()).select_from(ScoreRollup))} rollup rows")
@@ -0,0 +1,93 @@
+"""Startup schema check, run once per database rather than once per worker.
+
+Every worker calls ensure_schema() from the app lifespan, but the check runs
+under a database-wide lock (SQLite: BEGIN IMMEDIATE, Postgres: an advisory
+lock), so concurrent workers wait for whichever got there first instead of
+racing to issue the same DDL. When every table already exists nothing is
+created. On SQLite the question search index (app.db.search) is created
+the same way. Migrations stay with alembic: a database stamped at an older
+revision gets a warning, and one whose existing tables lack columns the
+models need (e.g. an old, never-migrated quiz.db) stops startup with
+SchemaOutOfDate instead of failing on the first query that touches them.
+"""
+import os, re, logging
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from app.db.models import Base
+from app.db.search import create_index
+
+# Set when a deploy step (e.g. `alembic upgrade head`) owns the schema
+SKIP_SCHEMA_INIT = os.getenv("SKIP_SCHEMA_INIT", "0") == "1"
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "migrations" / "versions"
+# Arbitrary, just has to be the same in every worker
+ADVISORY_LOCK_KEY = 0x71756976
+
+log = logging.getLogger(__name__)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_head(versions_dir: Path = VERSIONS_DIR) -> Optional[str]:
+    """Head revision, read straight from the migration files.
+
+    Importing alembic's script machinery costs ~0.5s, far more than the
+    whole app import, so this parses the revision lines instead.
+    """
+    revisions, parents = set(), set()
+    for path in versions_dir.glob("*.py"):
+        source = path.read_text()
+        rev = re.search(r'^revision = "([^"]+)"', source, re.M)
+        down = re.search(r'^down_revision = "([^"]+)"', source, re.M)
+        if rev:
+            revisions.add(rev.group(1))
+        if down:
+            parents.add(down.group(1))
+    heads = revisions - parents
+    return heads.pop() if len(heads) == 1 else None
+
+
+def _lock(conn: Connection):
+    if conn.dialect.name == "sqlite":
+        # Takes the write lock now; pysqlite won't open a second transaction on top
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+
+def missing_columns(conn: Connection, existing: set[str]) -> list[str]:
+    """`table.column` for every model column absent from a table that does exist."""
+    inspector = inspect(conn)
+    out = []
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            have = {c["name"] for c in inspector.get_columns(table.name)}
+            out += [f"{table.name}.{c.name}" for c in table.columns if c.name not in have]
+    return out
+
+
+def ensure_schema(engine: Engine) -> list[str]:
+    """Create missing tables under the lock; returns the names it created."""
+    with engine.connect() as conn:
+        _lock(conn)
+        existing = set(inspect(conn).get_table_names())
+        outdated = missing_columns(conn, existing)
+        if outdated:
+            raise SchemaOutOfDate(
+                f"Database is missing columns {', '.join(outdated)}: run `alembic upgrade head` (from backend) first"
+            )
+        missing = [t for t in Base.metadata.sorted_tables if t.name not in existing]
+        if missing:
+            Base.metadata.create_all(conn, tables=missing)
+        if conn.dialect.name == "sqlite" and "questions_fts" not in existing:
+            create_index(conn)
+        if "alembic_version" in existing:
+            current = conn.scalar(text("SELECT version_num FROM alembic_version"))
+            head = alembic_head()
+            if head and current != head:
+                log.warning("Database is at migration %s, code expects %s: run `alembic upgrade head`", current, head)
+        conn.commit()
+    return [t.name for t in missing]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from typing import List, Optional
 
 
@@ -23,6 +23,11 @@ class UserUpdate(BaseModel):
     email: Optional[str] = None
 
 
+class UserUpdated(UserProfile):
+    # Set when the change revoked the caller's token: use this one from now on
+    access_token: Optional[str] = None
+
+
 class Category(BaseModel):
     id: int
     name: str
@@ -34,20 +39,99 @@ class Question(BaseModel):
     incorrect_answers: List[str]
 
 
+# /quiz/search results; no answers, so search can't be used to look them up
+class SearchHit(BaseModel):
+    id: int
+    category: int
+    difficulty: str
+    question: str
+
+
+class SessionQuestion(BaseModel):
+    index: int
+    question: str
+    options: List[str]
+
+
 class StartOut(BaseModel):
-    items: List[Question]
+    # No answers: POST /quiz/sessions/{session_id}/answers reveals each one as it's answered
+    items: List[SessionQuestion]
+    # Resume with GET /quiz/sessions/{session_id}
+    session_id: str
 
 
-class SubmitIn(BaseModel):
+class SessionOut(BaseModel):
+    session_id: str
+    category: Optional[int]
+    difficulty: str
     total: int
+    answered: int
     correct: int
+    next_index: Optional[int] = None
+    finished: bool
+    questions: List[SessionQuestion]
+    answers: List[Optional[str]]
+
+
+class AnswerIn(BaseModel):
+    index: int
+    answer: str
+
+
+class AnswerOut(BaseModel):
+    index: int
+    correct: bool
+    correct_answer: str
+    answered: int
+    remaining: int
+
+
+class SubmitIn(BaseModel):
+    total: int = Field(gt=0)
+    correct: int = Field(ge=0)
     category: str
     difficulty: str
 
+    @model_validator(mode="after")
+    def _correct_within_total(self):
+        if self.correct > self.total:
+            raise ValueError("correct can't be more than total")
+        return self
+
 
 class ScoreOut(BaseModel):
+    # Handlers return Attempt rows as-is; validation reads the attributes directly
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     total: int
     correct: int
     category: str
     difficulty: str
+    # True when the server scored it from a quiz session
+    verified: bool = False
+
+
+class StatsOut(BaseModel):
+    category: str
+    difficulty: str
+    attempts: int
+    total: int
+    correct: int
+    accuracy: float
+
+
+class SummaryOut(BaseModel):
+    overall: Optional[StatsOut] = None
+    by_category: List[StatsOut] = []
+    by_difficulty: List[StatsOut] = []
+    by_category_difficulty: List[StatsOut] = []
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    name: str
+    attempts: int
+    total: int
+    correct: int
+    accuracy: float
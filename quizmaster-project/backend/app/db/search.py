@@ -0,0 +1,94 @@
+"""Keyword search over the question bank.
+
+On SQLite, `questions_fts` is an FTS5 index over the questions table
+(external content: the text itself lives only in `questions`). Triggers keep
+it in step with every insert, update and delete. Other databases fall back
+to ILIKE matching, which is slower but needs no extra setup.
+
+Re-index everything (e.g. after restoring a database without it) with:
+
+    python -m app.db.search rebuild
+"""
+import argparse, re
+from sqlalchemy import and_, column, literal_column, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Question
+
+FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5("
+    "question, correct_answer, content='questions', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN "
+    "INSERT INTO questions_fts(rowid, question, correct_answer) VALUES (new.id, new.question, new.correct_answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question, correct_answer) VALUES ('delete', old.id, old.question, old.correct_answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question, correct_answer) VALUES ('delete', old.id, old.question, old.correct_answer); "
+    "INSERT INTO questions_fts(rowid, question, correct_answer) VALUES (new.id, new.question, new.correct_answer); END",
+)
+
+fts = table("questions_fts", column("rowid"), column("rank"))
+
+
+def create_index(conn: Connection):
+    """Create the FTS5 table and its triggers and index existing rows (SQLite only; no commit)."""
+    if conn.dialect.name != "sqlite":
+        return
+    for ddl in FTS_DDL:
+        conn.exec_driver_sql(ddl)
+    rebuild(conn)
+
+
+def rebuild(conn: Connection):
+    conn.exec_driver_sql("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+
+
+def terms(q: str) -> list[str]:
+    return re.findall(r"\w+", q.lower())[:10]
+
+
+def _fts_query(words: list[str]) -> str:
+    # Quoted, so user input can't use FTS5 operators; `*` makes each word a prefix match
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _like(word: str) -> str:
+    return "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+async def search(db: AsyncSession, q: str, limit: int, category=None, difficulty=None) -> list[Question]:
+    """Best matches first. Every word must match, as a prefix (FTS) or substring (fallback)."""
+    words = terms(q)
+    if not words:
+        return []
+    if db.bind.dialect.name == "sqlite":
+        stmt = (
+            select(Question)
+            .join(fts, fts.c.rowid == Question.id)
+            .where(literal_column("questions_fts").op("MATCH")(_fts_query(words)))
+            .order_by(fts.c.rank)
+        )
+    else:
+        stmt = select(Question).where(and_(*(Question.question.ilike(_like(w), escape="\\") for w in words))).order_by(Question.id)
+    if category is not None:
+        stmt = stmt.where(Question.category == category)
+    if difficulty is not None:
+        stmt = stmt.where(Question.difficulty == difficulty)
+    return list(await db.scalars(stmt.limit(limit)))
+
+
+if __name__ == "__main__":
+    from app.db.schema import ensure_schema
+    from app.db.session import init_engines
+
+    parser = argparse.ArgumentParser(prog="python -m app.db.search")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    engine, _ = init_engines()
+    ensure_schema(engine)
+    with engine.begin() as conn:
+        if conn.dialect.name != "sqlite":
+            raise SystemExit("Full-text index is SQLite-only; other databases search with ILIKE")
+        rebuild(conn)
+        print(f"Indexed {conn.exec_driver_sql('SELECT count(*) FROM questions').scalar()} questions")
@@ -1,8 +1,93 @@
 import os
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from app.core.metrics import instrument_engine
+from app.core.profiling import log_slow_query
 
 DATABASE_URL = os.getenv("DATABASE_URL","sqlite:///./quiz.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# FULL: a commit (and so a score the writer has acknowledged) survives power loss.
+# NORMAL is faster under WAL, but the last commits can be lost on power failure.
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "FULL").upper()
+# SQLite reads anything it doesn't recognise as OFF
+if SQLITE_SYNCHRONOUS not in ("NORMAL", "FULL", "EXTRA"):
+    raise ValueError(f"SQLITE_SYNCHRONOUS must be NORMAL, FULL or EXTRA, not {SQLITE_SYNCHRONOUS!r}")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Drivers used by the async engine. Postgres needs `pip install asyncpg`.
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "postgres": "postgresql+asyncpg"}
+
+
+def async_url(url: str) -> str:
+    u = make_url(url)
+    if "+" in u.drivername:
+        return url
+    return u.set(drivername=ASYNC_DRIVERS.get(u.drivername, u.drivername)).render_as_string(hide_password=False)
+
+
+def _pool_options(url: str) -> dict:
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single shared connection; pool sizing doesn't apply
+        return {}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_pre_ping": DB_POOL_PRE_PING}
+
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    # WAL lets readers carry on while a write commits; busy_timeout makes
+    # writers wait for the lock instead of failing with "database is locked".
+    # SQLite ignores foreign keys (and so ON DELETE CASCADE) unless asked.
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cur.execute("PRAGMA foreign_keys=ON")
+    cur.close()
+
+
+# Created by init_engines(), which the app lifespan calls on startup. Nothing
+# touches the database (or even builds an engine) at import time.
+engine: Optional[Engine] = None
+async_engine: Optional[AsyncEngine] = None
+# Sync sessions: migrations, CLI commands and the background score writer thread
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# Async sessions: request handlers
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def init_engines(url: Optional[str] = None) -> tuple[Engine, AsyncEngine]:
+    """Create both engines and bind the session factories. Idempotent."""
+    global engine, async_engine
+    if engine is not None:
+        return engine, async_engine
+    url = url or DATABASE_URL
+    sync = create_engine(url, connect_args={"check_same_thread": False} if url.startswith("sqlite") else {}, **_pool_options(url))
+    aio = create_async_engine(async_url(url), **_pool_options(url))
+    if sync.dialect.name == "sqlite":
+        event.listen(sync, "connect", _sqlite_pragmas)
+        event.listen(aio.sync_engine, "connect", _sqlite_pragmas)
+    instrument_engine(sync, "sync", on_statement=log_slow_query)
+    instrument_engine(aio.sync_engine, "async", on_statement=log_slow_query)
+    SessionLocal.configure(bind=sync)
+    AsyncSessionLocal.configure(bind=aio)
+    engine, async_engine = sync, aio
+    return engine, async_engine
+
+
+async def dispose_engines():
+    global engine, async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+    engine = async_engine = None
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,140 @@
+import os, asyncio, logging, queue, threading, time
+from concurrent.futures import Future
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import insert
+from app.core.etag import bump
+from app.db.models import Attempt
+from app.db.rollups import apply_attempts
+from app.db.session import SessionLocal
+
+# Flush when this many rows are waiting, or this long after the first one arrived
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))
+WRITE_BATCH_DELAY = float(os.getenv("WRITE_BATCH_DELAY_MS", "5")) / 1000
+WRITE_TIMEOUT = 10
+
+log = logging.getLogger(__name__)
+
+RETURNED = (Attempt.id, Attempt.user_id, Attempt.total, Attempt.correct, Attempt.category, Attempt.difficulty, Attempt.verified, Attempt.created_at)
+
+
+class AttemptWriter:
+    """Write-behind queue that group-commits attempt inserts.
+
+    Each `submit()` is one unit (a single score, or a whole /scores/batch
+    body). A background thread collects units for a few milliseconds, inserts
+    them with one multi-row INSERT ... RETURNING, updates the rollups and the
+    users' data_version, and commits once. The returned future only resolves after that commit, so a
+    caller that waits on it has a durable acknowledgement.
+    """
+
+    def __init__(self, max_batch: int = WRITE_BATCH_SIZE, max_delay: float = WRITE_BATCH_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[tuple[list[dict], Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, rows: list[dict]) -> Future:
+        """Queue attempt rows (Attempt column values); resolves to the inserted rows once committed."""
+        fut: Future = Future()
+        if not rows:
+            fut.set_result([])
+            return fut
+        self._ensure_started()
+        self._queue.put((rows, fut))
+        return fut
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closing.clear()
+                self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+                self._thread.start()
+
+    def close(self, timeout: float = 10):
+        """Flush everything still queued, then stop the thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread:
+            self._closing.set()
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._closing.is_set():
+                    return
+                continue
+            batch = [first]
+            count = len(first[0])
+            deadline = time.monotonic() + self.max_delay
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                count += len(item[0])
+            # Callers that cancelled while queued are dropped; the rest can't cancel from here on
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # The thread must survive: every caller queued behind this batch waits on it
+                log.exception("Attempt writer failed to resolve a batch")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _flush(self, batch: list[tuple[list[dict], Future]]):
+        try:
+            results = self._commit([rows for rows, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Don't let one bad unit fail everybody else's writes
+            log.warning("Group commit of %d units failed (%s); retrying individually", len(batch), e)
+            for item in batch:
+                self._flush([item])
+            return
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
+
+    def _commit(self, units: list[list[dict]]) -> list[list]:
+        # Every row needs the same keys for one executemany
+        rows = [{"verified": False, **row} for unit in units for row in unit]
+        with SessionLocal() as db:
+            inserted = db.execute(insert(Attempt).returning(*RETURNED, sort_by_parameter_order=True), rows).all()
+            apply_attempts(db, inserted)
+            db.execute(bump({a.user_id for a in inserted}))
+            db.commit()
+        self.batches += 1
+        self.rows += len(rows)
+        out, start = [], 0
+        for unit in units:
+            out.append(inserted[start:start + len(unit)])
+            start += len(unit)
+        return out
+
+
+writer = AttemptWriter()
+
+
+async def committed(fut: Future) -> list:
+    """Wait for the writer to commit our rows; that commit is the acknowledgement."""
+    try:
+        # Shielded: giving up on the wait (timeout, client gone) mustn't cancel the write itself
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(fut)), WRITE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Score could not be saved in time, try again")
@@ -1,19 +1,89 @@
+import os, asyncio, logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from app.api.routes_auth import router as auth_router
-from app.api.routes_quiz import router as quiz_router
+from app.api.routes_quiz import load_categories, router as quiz_router
 from app.api.routes_scores import router as scores_router
+from app.api.routes_admin import is_admin, router as admin_router
+from app.core.compression import CompressionMiddleware
+from app.core.hashing import hasher
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.profiling import ProfilingMiddleware
+from app.core.question_bank import refiller
+from app.core.upstream import TriviaClient
+from app.db.writer import writer
+from app.db.schema import SKIP_SCHEMA_INIT, ensure_schema
+from app.db.session import dispose_engines, init_engines
 
-app = FastAPI(title="QuizMaster API", version="0.1.0")
+# Pre-spawn hash workers, open a DB connection and fetch categories on startup
+WARM_UP = os.getenv("WARM_UP", "1") == "1"
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+log = logging.getLogger(__name__)
 
-app.include_router(auth_router, prefix="/auth", tags=["auth"])
-app.include_router(quiz_router, prefix="/quiz", tags=["quiz"])
-app.include_router(scores_router, prefix="/scores", tags=["scores"])
+
+async def _warm_categories(trivia: TriviaClient):
+    try:
+        await load_categories(trivia)
+    except Exception as e:
+        log.warning("Warming the category cache failed: %s", e)
+
+
+def create_app(init_schema: bool = not SKIP_SCHEMA_INIT, warm_up: bool = WARM_UP) -> FastAPI:
+    """Build the app. Importing this module does no I/O; the lifespan does it all on startup."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        engine, async_engine = init_engines()
+        if init_schema:
+            created = await run_in_threadpool(ensure_schema, engine)
+            if created:
+                log.info("Created tables: %s", ", ".join(created))
+        app.state.trivia = TriviaClient()
+        refiller.start(app.state.trivia)
+        if warm_up:
+            hasher.warm()
+            async with async_engine.connect() as conn:
+                await conn.exec_driver_sql("SELECT 1")
+            # Don't hold up startup on opentdb
+            warming = asyncio.create_task(_warm_categories(app.state.trivia))
+        yield
+        if warm_up:
+            warming.cancel()
+        # Flush queued score writes before anything else goes away
+        await run_in_threadpool(writer.close)
+        await refiller.stop()
+        await app.state.trivia.aclose()
+        hasher.shutdown()
+        await dispose_engines()
+
+    app = FastAPI(title="QuizMaster API", version="0.1.0", lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Profile-Id"],
+    )
+    app.add_middleware(CompressionMiddleware)
+    # Inside MetricsMiddleware, so a profile can report the request's DB stats
+    app.add_middleware(ProfilingMiddleware, authorize=is_admin)
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(auth_router, prefix="/auth", tags=["auth"])
+    app.include_router(quiz_router, prefix="/quiz", tags=["quiz"])
+    app.include_router(scores_router, prefix="/scores", tags=["scores"])
+    app.include_router(admin_router, prefix="/admin", tags=["admin"])
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+app = create_app()
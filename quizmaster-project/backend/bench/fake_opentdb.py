@@ -0,0 +1,58 @@
+"""Local stand-in for opentdb.com used by the benchmarks.
+
+    FAKE_LATENCY_MS=80 FAKE_429_RATE=0.05 uvicorn bench.fake_opentdb:app --port 8099
+
+Serves the three endpoints the backend uses with a fixed latency and a
+configurable share of 429 responses, so runs are reproducible and never hit
+the real service.
+"""
+import os, asyncio, random, uuid
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+LATENCY = float(os.getenv("FAKE_LATENCY_MS", "50")) / 1000
+RATE_429 = float(os.getenv("FAKE_429_RATE", "0"))
+CATEGORIES = [{"id": i, "name": f"Category {i}"} for i in range(9, 33)]
+
+rng = random.Random(int(os.getenv("FAKE_SEED", "1")))
+
+
+def _question(category, difficulty):
+    n = rng.randrange(10**9)
+    return {
+        "type": "multiple",
+        "difficulty": difficulty,
+        "category": f"Category {category}",
+        "question": f"Question #{n} about &quot;{category}&quot;?",
+        "correct_answer": f"Right {n}",
+        "incorrect_answers": [f"Wrong {n}-{i}" for i in range(3)],
+    }
+
+
+async def _upstream():
+    await asyncio.sleep(LATENCY)
+    if RATE_429 and rng.random() < RATE_429:
+        return JSONResponse({"response_code": 5, "results": []}, status_code=429)
+
+
+async def api_category(request):
+    return await _upstream() or JSONResponse({"trivia_categories": CATEGORIES})
+
+
+async def api_token(request):
+    return await _upstream() or JSONResponse({"response_code": 0, "token": uuid.uuid4().hex})
+
+
+async def api(request):
+    q = request.query_params
+    amount = min(int(q.get("amount", 10)), 50)
+    results = [_question(q.get("category", "9"), q.get("difficulty", "easy")) for _ in range(amount)]
+    return await _upstream() or JSONResponse({"response_code": 0, "results": results})
+
+
+app = Starlette(routes=[
+    Route("/api_category.php", api_category),
+    Route("/api_token.php", api_token),
+    Route("/api.php", api),
+])
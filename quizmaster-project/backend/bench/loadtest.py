@@ -0,0 +1,203 @@
+"""Mixed-traffic load test for the QuizMaster API.
+
+Run from quizmaster-project/backend:
+
+    python -m bench.loadtest                         # report only
+    python -m bench.loadtest --save-baseline         # record bench/baseline.json
+    python -m bench.loadtest --check                 # exit 1 on regression (CI)
+
+Boots app.main:app with uvicorn against a temporary SQLite database and the
+local fake opentdb (bench/fake_opentdb.py), then runs virtual users that
+register, log in, and loop over categories -> start -> submit -> list scores.
+"""
+import argparse, asyncio, json, os, random, socket, subprocess, sys, tempfile, time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+import httpx
+
+BACKEND = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+# Routes with fewer samples than this (register/login run once per user) are too noisy to gate on
+MIN_SAMPLES = 50
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, expected: tuple = (), **kw) -> Optional[httpx.Response]:
+        """The response, or None when the request itself failed (timeout, reset).
+
+        Both count as errors, except responses with a status in `expected`.
+        """
+        start = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kw)
+        except httpx.HTTPError:
+            r = None
+        self.samples[route].append(time.perf_counter() - start)
+        if r is None or (r.status_code >= 400 and r.status_code not in expected):
+            self.errors[route] += 1
+        return r
+
+    def report(self, elapsed: float) -> dict:
+        out = {}
+        for route, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            out[route] = {
+                "count": len(ordered),
+                "errors": self.errors[route],
+                "rps": round(len(ordered) / elapsed, 1),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            }
+        return out
+
+
+async def auth_call(rec: Recorder, client: httpx.AsyncClient, path: str, creds: dict, deadline: float) -> Optional[httpx.Response]:
+    # bcrypt sheds load with 503 + Retry-After under a burst; back off like a real client would.
+    # Those 503s are the server working as designed, so they aren't errors.
+    while True:
+        r = await rec.call(client, f"POST {path}", "POST", path, expected=(503,), json=creds)
+        if (r is not None and r.status_code != 503) or time.monotonic() >= deadline:
+            return r
+        await asyncio.sleep(float(r.headers.get("Retry-After", "1")) if r is not None else 1)
+
+
+async def virtual_user(n: int, base: str, rec: Recorder, deadline: float, rng: random.Random):
+    async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+        creds = {"email": f"bench{n}-{rng.randrange(10**9)}@example.com", "password": "Password123!"}
+        await auth_call(rec, client, "/auth/register", creds, deadline)
+        r = await auth_call(rec, client, "/auth/login", creds, deadline)
+        # Already counted as an error (e.g. registering was shed until the deadline)
+        if r is None or r.status_code != 200:
+            return
+        headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+
+        while time.monotonic() < deadline:
+            r = await rec.call(client, "GET /quiz/categories", "GET", "/quiz/categories", headers=headers)
+            cats = r.json() if r is not None and r.status_code == 200 else None
+            category = rng.choice(cats)["id"] if isinstance(cats, list) and cats else 9
+            difficulty = rng.choice(["easy", "medium", "hard"])
+            r = await rec.call(client, "GET /quiz/start", "GET", "/quiz/start", headers=headers,
+                               params={"category": category, "difficulty": difficulty, "amount": 10})
+            total = len(r.json().get("items", [])) if r is not None and r.status_code == 200 else 10
+            await rec.call(client, "POST /scores", "POST", "/scores", headers=headers, json={
+                "total": total, "correct": rng.randint(0, total), "category": str(category), "difficulty": difficulty,
+            })
+            await rec.call(client, "GET /scores", "GET", "/scores", headers=headers)
+
+
+def start_server(args: list[str], env: dict, port: int) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env={**os.environ, **env},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"uvicorn {args[0]} did not start")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for route, base in baseline.items():
+        if base["count"] < MIN_SAMPLES:
+            continue
+        now = report.get(route)
+        if now is None:
+            problems.append(f"{route}: missing from this run")
+            continue
+        if now["p95_ms"] > base["p95_ms"] * tolerance:
+            problems.append(f"{route}: p95 {now['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+        if now["rps"] < base["rps"] / tolerance:
+            problems.append(f"{route}: {now['rps']} req/s vs baseline {base['rps']} req/s")
+        # Failing fast looks like a speedup above, so errors are checked on their own
+        if now["errors"] / now["count"] > base["errors"] / base["count"]:
+            problems.append(f"{route}: {now['errors']}/{now['count']} errors vs baseline {base['errors']}/{base['count']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.loadtest")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of mixed traffic")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50)
+    parser.add_argument("--upstream-429-rate", type=float, default=0.05)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor vs baseline")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline and exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="quizbench-")
+    fake_port, app_port = free_port(), free_port()
+    fake = start_server(["bench.fake_opentdb:app"], {
+        "FAKE_LATENCY_MS": str(args.upstream_latency_ms),
+        "FAKE_429_RATE": str(args.upstream_429_rate),
+        "FAKE_SEED": str(args.seed),
+    }, fake_port)
+    try:
+        server = start_server(["app.main:app"], {
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "EXTERNAL_API_BASE": f"http://127.0.0.1:{fake_port}",
+            "QUESTION_BANK_INTERVAL": "0.05",
+            "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        }, app_port)
+        try:
+            rec = Recorder()
+            rng = random.Random(args.seed)
+            start = time.monotonic()
+            deadline = start + args.duration
+
+            async def run():
+                await asyncio.gather(*(
+                    virtual_user(i, f"http://127.0.0.1:{app_port}", rec, deadline, random.Random(rng.random()))
+                    for i in range(args.users)
+                ))
+
+            asyncio.run(run())
+            report = rec.report(time.monotonic() - start)
+        finally:
+            server.terminate()
+            server.wait(10)
+    finally:
+        fake.terminate()
+        fake.wait(10)
+
+    print(f"{'route':<22}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, r in report.items():
+        print(f"{route:<22}{r['count']:>8}{r['errors']:>8}{r['rps']:>9}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+    if args.check:
+        problems = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for p in problems:
+            print("REGRESSION:", p)
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
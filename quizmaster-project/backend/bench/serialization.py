@@ -0,0 +1,97 @@
+"""Micro-benchmarks for the JSON response path and compression.
+
+Run from quizmaster-project/backend:
+
+    python -m bench.serialization
+
+"before" is what the handlers used to do: build a Pydantic model per row by
+hand, then let FastAPI validate the list and dump it. "after" is the current
+path: select only the schema's columns, map rows to dicts and encode with
+orjson (app.core.responses). Rows come from a real in-memory SQLite
+database, so both sides see the same objects the handlers do.
+"""
+import argparse, gzip, statistics, time
+from typing import List
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from app.core import compression
+from app.core.responses import records
+from app.db.models import Attempt, Base, User
+from app.db.schemas import ScoreOut, SessionQuestion, StartOut
+
+SCORE_COLUMNS = (Attempt.id, Attempt.total, Attempt.correct, Attempt.category, Attempt.difficulty, Attempt.verified)
+SCORE_FIELDS = [c.key for c in SCORE_COLUMNS]
+
+
+def timed(fn, repeat: int) -> float:
+    """Median microseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def score_payloads(sizes: list[int]):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="bench@example.com", password=""))
+        db.execute(insert(Attempt), [
+            {"user_id": 1, "total": 10, "correct": i % 11, "category": str(9 + i % 24), "difficulty": ("easy", "medium", "hard")[i % 3]}
+            for i in range(max(sizes))
+        ])
+        db.commit()
+        for n in sizes:
+            orm = list(db.scalars(select(Attempt).limit(n)))
+            rows = db.execute(select(*SCORE_COLUMNS, Attempt.created_at).limit(n)).all()
+            yield f"GET /scores ({n} rows)", orm, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.serialization")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    scores = TypeAdapter(List[ScoreOut])
+    start_out = TypeAdapter(StartOut)
+    cases = []
+    for name, orm, rows in score_payloads([50, 200, 1000]):
+        before = lambda orm=orm: scores.dump_json(scores.validate_python(
+            [ScoreOut(id=i.id, total=i.total, correct=i.correct, category=i.category, difficulty=i.difficulty, verified=i.verified) for i in orm]
+        ))
+        after = lambda rows=rows: orjson.dumps(records(rows, SCORE_FIELDS))
+        cases.append((name, before, after))
+    for n in (10, 50):
+        items = [{"index": i, "question": f"Question number {i} about something?", "options": ["Right", "Wrong", "Nope", "Also wrong"]} for i in range(n)]
+        before = lambda items=items: start_out.dump_json(start_out.validate_python(StartOut(items=[SessionQuestion(**i) for i in items], session_id="x" * 22)))
+        after = lambda items=items: orjson.dumps({"items": items, "session_id": "x" * 22})
+        cases.append((f"GET /quiz/start ({n} questions)", before, after))
+
+    print(f"{'payload':<32}{'bytes':>9}{'before us':>12}{'after us':>11}{'speedup':>9}")
+    bodies = {}
+    for name, before, after in cases:
+        assert orjson.loads(before()) == orjson.loads(after())
+        b, a = timed(before, args.repeat), timed(after, args.repeat)
+        body = bodies[name] = after()
+        print(f"{name:<32}{len(body):>9}{b:>12.1f}{a:>11.1f}{b / a:>8.1f}x")
+
+    print()
+    print(f"{'payload':<32}{'encoding':>10}{'bytes':>9}{'ratio':>8}{'us':>10}")
+    encoders = {"gzip": lambda body: gzip.compress(body, compression.GZIP_LEVEL)}
+    if compression.brotli is not None:
+        encoders["br"] = lambda body: compression.brotli.compress(body, quality=compression.BROTLI_QUALITY)
+    for name, body in bodies.items():
+        for encoding, encode in encoders.items():
+            out = encode(body)
+            us = timed(lambda: encode(body), max(20, args.repeat // 10))
+            print(f"{name:<32}{encoding:>10}{len(out):>9}{len(body) / len(out):>7.1f}x{us:>10.1f}")
+    if compression.brotli is None:
+        print("(brotli not installed; `pip install brotli` to compare)")
+
+
+if __name__ == "__main__":
+    main()
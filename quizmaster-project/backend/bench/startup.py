@@ -0,0 +1,109 @@
+"""Import-time and startup benchmark.
+
+Run from quizmaster-project/backend:
+
+    python -m bench.startup                          # report only
+    python -m bench.startup --save-baseline          # record bench/startup_baseline.json
+    python -m bench.startup --check                  # exit 1 on regression (CI)
+
+Each run is a fresh interpreter that imports app.main and then runs the app
+lifespan's startup half, once against a new database (tables get created)
+and once against an existing one. Also fails the check if importing the app
+pulls in any of LAZY_MODULES or touches the database.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "startup_baseline.json"
+# Only needed for rare paths (Google sign-in, hashing in worker processes, migrations)
+LAZY_MODULES = ("requests", "google.auth", "passlib", "alembic")
+
+PROBE = """
+import asyncio, json, os, sys, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+lazy = [m for m in %(lazy)r if m in sys.modules]
+touched = os.path.exists(%(db)r)
+
+async def boot():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+t2 = asyncio.run(boot())
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "startup_ms": (t2 - t1) * 1000, "lazy_imported": lazy, "db_touched_on_import": touched}))
+"""
+
+
+def probe(db_path: str) -> dict:
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE % {"lazy": LAZY_MODULES, "db": db_path}],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "WARM_UP": "0"},
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def run(runs: int) -> dict:
+    samples = {"cold": [], "warm": []}
+    for _ in range(runs):
+        db = os.path.join(tempfile.mkdtemp(prefix="quizstart-"), "startup.db")
+        samples["cold"].append(probe(db))
+        samples["warm"].append(probe(db))
+    report = {}
+    for kind, results in samples.items():
+        report[kind] = {
+            key: round(statistics.median(r[key] for r in results), 1)
+            for key in ("import_ms", "startup_ms", "process_ms")
+        }
+    report["lazy_imported"] = sorted({m for r in samples["cold"] for m in r["lazy_imported"]})
+    report["db_touched_on_import"] = any(r["db_touched_on_import"] for r in samples["cold"])
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    if report["lazy_imported"]:
+        problems.append(f"importing app.main pulled in {', '.join(report['lazy_imported'])}")
+    if report["db_touched_on_import"]:
+        problems.append("importing app.main touched the database")
+    for kind in ("cold", "warm"):
+        for key in ("import_ms", "startup_ms"):
+            now, base = report[kind][key], baseline[kind][key]
+            if now > base * tolerance:
+                problems.append(f"{kind} {key}: {now}ms vs baseline {base}ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench.startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor vs baseline")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline and exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    args = parser.parse_args()
+
+    report = run(args.runs)
+    print(f"{'database':<10}{'import ms':>12}{'startup ms':>12}{'process ms':>12}")
+    for kind in ("cold", "warm"):
+        r = report[kind]
+        print(f"{kind:<10}{r['import_ms']:>12}{r['startup_ms']:>12}{r['process_ms']:>12}")
+    print("lazy modules imported:", ", ".join(report["lazy_imported"]) or "none")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Saved baseline to {args.baseline}")
+    if args.check:
+        problems = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for p in problems:
+            print("REGRESSION:", p)
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""baseline schema
+
+Existing quiz.db files were created by Base.metadata.create_all, so every
+table here is only created if it is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("password", sa.String(255), nullable=False),
+            sa.Column("name", sa.String(100), nullable=True),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+    if "attempts" not in tables:
+        op.create_table(
+            "attempts",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("total", sa.Integer(), nullable=False),
+            sa.Column("correct", sa.Integer(), nullable=False),
+            sa.Column("category", sa.String(128), nullable=False),
+            sa.Column("difficulty", sa.String(32), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        )
+    if "questions" not in tables:
+        op.create_table(
+            "questions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("category", sa.Integer(), nullable=False),
+            sa.Column("difficulty", sa.String(32), nullable=False),
+            sa.Column("question", sa.Text(), nullable=False),
+            sa.Column("correct_answer", sa.Text(), nullable=False),
+            sa.Column("incorrect_answers", sa.JSON(), nullable=False),
+            sa.Column("fingerprint", sa.String(40), nullable=False, unique=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_questions_bucket", "questions", ["category", "difficulty"])
+
+
+def downgrade():
+    op.drop_table("questions")
+    op.drop_table("attempts")
+    op.drop_table("users")
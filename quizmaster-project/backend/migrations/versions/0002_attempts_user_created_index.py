@@ -0,0 +1,20 @@
+"""composite index for keyset-paginated /scores
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_attempts_user_created", "attempts", ["user_id", "created_at", "id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_attempts_user_created", table_name="attempts")
@@ -0,0 +1,28 @@
+"""users.token_version and non-reused user ids
+
+Tokens now identify users by id, so SQLite must not hand a deleted user's id
+to the next registration; the users table is rebuilt with AUTOINCREMENT.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("users")}
+    with op.batch_alter_table("users", recreate="always", table_kwargs={"sqlite_autoincrement": True}) as batch:
+        if "token_version" not in columns:
+            batch.add_column(sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("token_version")
@@ -0,0 +1,34 @@
+"""score_rollups for /scores/summary and /scores/leaderboard
+
+Fill it for existing data with `python -m app.db.rollups rebuild`.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "score_rollups" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "score_rollups",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("category", sa.String(128), primary_key=True),
+        sa.Column("difficulty", sa.String(32), primary_key=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("correct", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_score_rollups_board", "score_rollups", ["category", "difficulty", "correct"])
+
+
+def downgrade():
+    op.drop_table("score_rollups")
@@ -0,0 +1,25 @@
+"""users.data_version for conditional GETs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("users")}
+    if "data_version" not in columns:
+        with op.batch_alter_table("users") as batch:
+            batch.add_column(sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("users", table_kwargs={"sqlite_autoincrement": True}) as batch:
+        batch.drop_column("data_version")
@@ -0,0 +1,40 @@
+"""ON DELETE CASCADE from users to attempts and score_rollups
+
+Deleting an account is now one DELETE on users; the database removes the
+user's rows in the other tables.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# SQLite foreign keys are unnamed; this lets batch mode address them
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+TABLES = ("attempts", "score_rollups")
+
+
+def _set_ondelete(table: str, ondelete):
+    fks = [fk for fk in sa.inspect(op.get_bind()).get_foreign_keys(table) if fk["referred_table"] == "users"]
+    if not fks or (fks[0].get("options") or {}).get("ondelete") == ondelete:
+        return
+    name = f"fk_{table}_user_id_users"
+    with op.batch_alter_table(table, naming_convention=NAMING) as batch:
+        batch.drop_constraint(fks[0]["name"] or name, type_="foreignkey")
+        batch.create_foreign_key(name, "users", ["user_id"], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    for table in TABLES:
+        _set_ondelete(table, "CASCADE")
+
+
+def downgrade():
+    for table in TABLES:
+        _set_ondelete(table, None)
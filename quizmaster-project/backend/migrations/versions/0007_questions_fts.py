@@ -0,0 +1,42 @@
+"""questions_fts full-text index (SQLite only)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Same DDL as app.db.search, copied so this revision doesn't change if that module does
+DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5("
+    "question, correct_answer, content='questions', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN "
+    "INSERT INTO questions_fts(rowid, question, correct_answer) VALUES (new.id, new.question, new.correct_answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question, correct_answer) VALUES ('delete', old.id, old.question, old.correct_answer); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question, correct_answer) VALUES ('delete', old.id, old.question, old.correct_answer); "
+    "INSERT INTO questions_fts(rowid, question, correct_answer) VALUES (new.id, new.question, new.correct_answer); END",
+    "INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    # Other databases search with ILIKE and need nothing here
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for ddl in DDL:
+        op.execute(ddl)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("questions_fts_ai", "questions_fts_ad", "questions_fts_au"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS questions_fts")
@@ -0,0 +1,33 @@
+"""attempts.verified: server-scored quiz sessions vs client-reported scores
+
+Only verified attempts count towards score_rollups (summaries and the
+leaderboard). Every existing attempt was reported by the client, so the
+rollups start empty; `python -m app.db.rollups rebuild` after a downgrade
+restores the old all-attempts totals.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("attempts")}
+    if "verified" not in columns:
+        with op.batch_alter_table("attempts") as batch:
+            batch.add_column(sa.Column("verified", sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.execute("DELETE FROM score_rollups")
+
+
+def downgrade():
+    with op.batch_alter_table("attempts", naming_convention=NAMING) as batch:
+        batch.drop_column("verified")
@@ -0,0 +1,64 @@
+"""score_rollups: all-attempt totals again, verified_* totals for the leaderboard
+
+0008 limited the rollups to verified attempts, which left players' own
+summaries without their history. attempts/total/correct count every attempt
+again; the new verified_* columns count server-scored ones and the
+leaderboard index moves to verified_correct. Rollups are recomputed here.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+NAMING = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+VERIFIED = ("verified_attempts", "verified_total", "verified_correct")
+BOARD = ["category", "difficulty", "verified_correct"]
+GROUPINGS = (
+    ("category", "difficulty", "user_id, category, difficulty"),
+    ("category", "'*'", "user_id, category"),
+    ("'*'", "difficulty", "user_id, difficulty"),
+    ("'*'", "'*'", "user_id"),
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("score_rollups")}
+    board = {i["name"]: i["column_names"] for i in inspector.get_indexes("score_rollups")}.get("ix_score_rollups_board")
+    if board is not None and board != BOARD:
+        op.drop_index("ix_score_rollups_board", table_name="score_rollups")
+    with op.batch_alter_table("score_rollups", naming_convention=NAMING) as batch:
+        for name in VERIFIED:
+            if name not in columns:
+                batch.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+    if board != BOARD:
+        op.create_index("ix_score_rollups_board", "score_rollups", BOARD)
+
+    op.execute("DELETE FROM score_rollups")
+    for category, difficulty, group_by in GROUPINGS:
+        op.execute(
+            "INSERT INTO score_rollups (user_id, category, difficulty, attempts, total, correct, "
+            "verified_attempts, verified_total, verified_correct) "
+            f"SELECT user_id, {category}, {difficulty}, count(id), sum(total), sum(correct), "
+            "sum(CASE WHEN verified THEN 1 ELSE 0 END), sum(CASE WHEN verified THEN total ELSE 0 END), "
+            "sum(CASE WHEN verified THEN correct ELSE 0 END) "
+            f"FROM attempts GROUP BY {group_by}"
+        )
+
+
+def downgrade():
+    # Back to 0008's verified-only rollups
+    op.execute("UPDATE score_rollups SET attempts = verified_attempts, total = verified_total, correct = verified_correct")
+    op.execute("DELETE FROM score_rollups WHERE attempts = 0")
+    op.drop_index("ix_score_rollups_board", table_name="score_rollups")
+    with op.batch_alter_table("score_rollups", naming_convention=NAMING) as batch:
+        for name in VERIFIED:
+            batch.drop_column(name)
+    op.create_index("ix_score_rollups_board", "score_rollups", ["category", "difficulty", "correct"])
@@ -0,0 +1,18 @@
+import os, tempfile
+
+# Point the app at a throwaway database before anything imports app.db.session
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """What the app lifespan does on startup; TestClient only runs it inside a `with` block."""
+    from app.db.schema import ensure_schema
+    from app.db.session import init_engines
+
+    engine, _ = init_engines()
+    ensure_schema(engine)
+    yield engine
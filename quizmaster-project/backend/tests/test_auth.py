@@ -1,4 +1,80 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import event
 from app.core.security import create_access_token
+from app.main import app
+from app.db import session
+
+client = TestClient(app)
+
 def test_jwt_builds():
     tok = create_access_token({"sub":"demo@user.com"})
     assert tok.count('.') == 2
+
+def register(email):
+    r = client.post("/auth/register", json={"email": email, "password": "pw"})
+    assert r.status_code == 200
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+def login(email):
+    r = client.post("/auth/login", json={"email": email, "password": "pw"})
+    assert r.status_code == 200
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+def test_identity_is_cached_between_requests():
+    headers = register("cached@user.com")
+    client.get("/scores", headers=headers)
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+    event.listen(session.async_engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        client.get("/scores", headers=headers)
+    finally:
+        event.remove(session.async_engine.sync_engine, "before_cursor_execute", listener)
+    assert statements
+    # Only the ETag's version stamp is read, never the user row itself
+    assert not any("users.email" in s for s in statements)
+
+def test_email_change_revokes_old_tokens():
+    headers = register("old@user.com")
+    other_device = login("old@user.com")
+    r = client.patch("/auth/me", json={"email": "new@user.com"}, headers=headers)
+    assert r.status_code == 200
+    fresh = {"Authorization": "Bearer " + r.json()["access_token"]}
+    assert client.get("/auth/me", headers=fresh).json()["email"] == "new@user.com"
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert client.get("/auth/me", headers=other_device).status_code == 401
+
+def test_name_change_keeps_tokens():
+    headers = register("keep@user.com")
+    r = client.patch("/auth/me", json={"name": "Kept"}, headers=headers)
+    assert r.json()["access_token"] is None
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+def test_logout_all_revokes_every_token():
+    headers = register("everywhere@user.com")
+    other_device = login("everywhere@user.com")
+    assert client.post("/auth/logout-all", headers=headers).status_code == 204
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert client.get("/auth/me", headers=other_device).status_code == 401
+    assert client.get("/auth/me", headers=login("everywhere@user.com")).status_code == 200
+
+def test_deleted_user_token_is_rejected():
+    headers = register("gone@user.com")
+    assert client.delete("/auth/me", headers=headers).status_code == 204
+    assert client.get("/scores", headers=headers).status_code == 401
+
+def test_me_conditional_get():
+    headers = register("etag-me@user.com")
+    r = client.get("/auth/me", headers=headers)
+    etag = r.headers["ETag"]
+    assert r.headers["Cache-Control"] == "private, no-cache"
+
+    r = client.get("/auth/me", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+
+    client.patch("/auth/me", json={"name": "Renamed"}, headers=headers)
+    r = client.get("/auth/me", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["name"] == "Renamed"
+    assert r.headers["ETag"] != etag
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from app.core.cache import TTLCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(10)))
+        return results, await cache.get_or_load("k", loader)
+
+    results, again = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == ["value"] * 10
+    assert again == "value"
+    assert cache.stats()["hits"] == 1
+
+
+def test_serves_stale_on_error():
+    cache = TTLCache(ttl=0)
+    cache.set("k", "old")
+
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    assert asyncio.run(cache.get_or_load("k", broken)) == "old"
+    assert cache.stats()["load_errors"] == 1
+
+
+def test_error_without_stale_value_raises():
+    cache = TTLCache(ttl=60)
+
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_load("k", broken))
+
+
+def test_stale_while_revalidate_refreshes_in_background():
+    cache = TTLCache(ttl=0, swr=60)
+    cache.set("k", "old")
+
+    async def loader():
+        return "new"
+
+    async def main():
+        stale = await cache.get_or_load("k", loader)
+        await asyncio.sleep(0.01)
+        cache.ttl = 60
+        return stale, await cache.get_or_load("k", loader)
+
+    assert asyncio.run(main()) == ("old", "new")
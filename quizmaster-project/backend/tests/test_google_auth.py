@@ -0,0 +1,150 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest, requests
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi.testclient import TestClient
+from google.auth import crypt, jwt as google_jwt
+from app.main import app
+from app.core.google_auth import GoogleTokenVerifier, get_google_verifier
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+
+
+def make_key(kid):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, kid)])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(1).not_valid_before(now - timedelta(days=1)).not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    pem_key = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return crypt.RSASigner.from_string(pem_key, key_id=kid), cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class FakeCertsEndpoint:
+    """Stands in for Google's cert URL: a requests.Session-like object serving a local key set."""
+
+    def __init__(self, certs, max_age=3600):
+        self.certs = certs
+        self.max_age = max_age
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        endpoint = self
+
+        class Resp:
+            status_code = 200
+            headers = {"Cache-Control": f"public, max-age={endpoint.max_age}"}
+            def raise_for_status(self): pass
+            def json(self): return dict(endpoint.certs)
+        return Resp()
+
+
+def id_token(signer, **claims):
+    now = int(time.time())
+    payload = {"iss": "https://accounts.google.com", "aud": CLIENT_ID, "iat": now, "exp": now + 600,
+               "email": "g@user.com", "email_verified": True, "name": "G User", **claims}
+    return google_jwt.encode(signer, payload).decode()
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return make_key("k1"), make_key("k2")
+
+
+def test_certs_are_fetched_once(keys):
+    (signer, cert), _ = keys
+    endpoint = FakeCertsEndpoint({"k1": cert})
+    verifier = GoogleTokenVerifier(CLIENT_ID, session=endpoint)
+    for _ in range(3):
+        assert verifier.verify(id_token(signer))["email"] == "g@user.com"
+    assert endpoint.calls == 1
+
+
+def test_rotated_key_triggers_refetch(keys):
+    (signer1, cert1), (signer2, cert2) = keys
+    endpoint = FakeCertsEndpoint({"k1": cert1})
+    verifier = GoogleTokenVerifier(CLIENT_ID, session=endpoint)
+    verifier.verify(id_token(signer1))
+    endpoint.certs = {"k1": cert1, "k2": cert2}
+    assert verifier.verify(id_token(signer2))["email"] == "g@user.com"
+    assert endpoint.calls == 2
+
+
+def test_unknown_key_refetches_at_most_once_a_minute(keys):
+    (signer1, cert1), (signer2, _) = keys
+    endpoint = FakeCertsEndpoint({"k1": cert1})
+    verifier = GoogleTokenVerifier(CLIENT_ID, session=endpoint)
+    verifier.verify(id_token(signer1))
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            verifier.verify(id_token(signer2))
+    assert endpoint.calls == 2
+
+
+def test_wrong_audience_is_rejected(keys):
+    (signer, cert), _ = keys
+    verifier = GoogleTokenVerifier(CLIENT_ID, session=FakeCertsEndpoint({"k1": cert}))
+    with pytest.raises(ValueError):
+        verifier.verify(id_token(signer, aud="someone-else"))
+
+
+class DownEndpoint:
+    def get(self, url, timeout=None):
+        raise requests.ConnectionError("unreachable")
+
+
+def test_google_login_errors(keys):
+    (signer1, cert1), (signer2, _) = keys
+    client = TestClient(app)
+    login = lambda signer: client.post("/auth/google", json={"id_token": id_token(signer, email="oauth-err@user.com")})
+    try:
+        app.dependency_overrides[get_google_verifier] = lambda: GoogleTokenVerifier(CLIENT_ID, session=DownEndpoint())
+        assert login(signer1).status_code == 503
+        verifier = GoogleTokenVerifier(CLIENT_ID, session=FakeCertsEndpoint({"k1": cert1}))
+        app.dependency_overrides[get_google_verifier] = lambda: verifier
+        assert login(signer2).status_code == 401
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_google_login_endpoint(keys):
+    (signer, cert), _ = keys
+    verifier = GoogleTokenVerifier(CLIENT_ID, session=FakeCertsEndpoint({"k1": cert}))
+    app.dependency_overrides[get_google_verifier] = lambda: verifier
+    try:
+        client = TestClient(app)
+        r = client.post("/auth/google", json={"id_token": id_token(signer, email="oauth@user.com")})
+        assert r.status_code == 200
+        me = client.get("/auth/me", headers={"Authorization": "Bearer " + r.json()["access_token"]})
+        assert me.json()["email"] == "oauth@user.com"
+        r = client.post("/auth/login", json={"email": "oauth@user.com", "password": ""})
+        assert r.status_code == 401
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_google_login_filling_the_name_changes_the_etag(keys):
+    (signer, cert), _ = keys
+    client = TestClient(app)
+    r = client.post("/auth/register", json={"email": "nameless@user.com", "password": "pw"})
+    headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+    client.patch("/auth/me", json={"name": ""}, headers=headers)
+    etag = client.get("/auth/me", headers=headers).headers["ETag"]
+
+    verifier = GoogleTokenVerifier(CLIENT_ID, session=FakeCertsEndpoint({"k1": cert}))
+    app.dependency_overrides[get_google_verifier] = lambda: verifier
+    try:
+        r = client.post("/auth/google", json={"id_token": id_token(signer, email="nameless@user.com", name="Named")})
+        assert r.status_code == 200
+    finally:
+        app.dependency_overrides.clear()
+    r = client.get("/auth/me", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["name"] == "Named"
@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from app.core.hashing import PasswordHasher
+
+
+@pytest.fixture(scope="module")
+def hasher():
+    h = PasswordHasher(workers=1, max_pending=4)
+    yield h
+    h.shutdown()
+
+
+def test_hash_and_verify(hasher):
+    hashed = hasher.hash("secret")
+    assert hasher.verify_and_update("secret", hashed) == (True, None)
+    assert asyncio.run(hasher.averify_and_update("wrong", hashed))[0] is False
+    assert hasher.stats()["hash"]["count"] == 1
+
+
+def test_outdated_hash_is_upgraded(hasher):
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    ok, new_hash = hasher.verify_and_update("secret", old)
+    assert ok
+    assert new_hash and not new_hash.startswith("$2b$04$")
+
+
+def test_sheds_load_when_queue_is_full():
+    h = PasswordHasher(workers=1, max_pending=0)
+    with pytest.raises(HTTPException) as e:
+        h.hash("secret")
+    assert e.value.status_code == 503
+    assert h.stats()["hash"]["rejected"] == 1
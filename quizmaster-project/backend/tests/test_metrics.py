@@ -0,0 +1,71 @@
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.metrics import Histogram, db_queries_per_request, http_requests, observe_upstream, upstream_errors
+
+client = TestClient(app)
+
+def login():
+    body = {"email":"metrics@user.com","password":"demo"}
+    r = client.post("/auth/register", json=body)
+    if r.status_code == 400:
+        r = client.post("/auth/login", json=body)
+    assert r.status_code == 200
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+def test_route_template_and_db_queries():
+    headers = login()
+    before = db_queries_per_request.count("/scores")
+    r = client.get("/scores?limit=5", headers=headers)
+    assert r.status_code == 200
+    # Labels use the route template, not the raw path with its query string
+    assert http_requests.value("GET", "/scores", 200) >= 1
+    assert db_queries_per_request.count("/scores") == before + 1
+
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/scores",status="200"}' in body
+    assert 'db_queries_per_request_bucket{route="/scores",le="+Inf"}' in body
+    assert "db_pool_checkouts_total" in body
+
+def test_cache_stats_are_exported():
+    from app.api.routes_quiz import categories_cache
+    from app.core.security import principal_cache
+
+    client.get("/scores", headers=login())
+    body = client.get("/metrics").text
+    assert f'cache_lookups_total{{cache="principals",result="hits"}} {principal_cache.hits}' in body
+    assert f'cache_lookups_total{{cache="categories",result="misses"}} {categories_cache.misses}' in body
+    assert 'cache_entries{cache="principals"}' in body
+    assert "# TYPE cache_lookups_total counter" in body
+
+def test_failed_statement_leaves_no_timer():
+    import pytest
+    from sqlalchemy import text
+    from app.db.session import init_engines
+
+    engine, _ = init_engines()
+    with engine.connect() as conn:
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM no_such_table"))
+        assert "query_start" not in conn.info
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+
+def test_unknown_paths_share_one_label():
+    client.get("/no/such/thing")
+    client.get("/another/missing/path")
+    assert http_requests.value("GET", "unmatched", 404) >= 2
+
+def test_upstream_errors_counted():
+    observe_upstream("test", time.perf_counter(), 503)
+    observe_upstream("test", time.perf_counter(), error="ConnectTimeout")
+    assert upstream_errors.value("test", "503") == 1
+    assert upstream_errors.value("test", "ConnectTimeout") == 1
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("h", "test", buckets=(1, 5))
+    for v in (0.5, 1, 3, 10):
+        h.observe(v)
+    lines = h._samples()
+    assert lines[:3] == ['h_bucket{le="1"} 2', 'h_bucket{le="5"} 3', 'h_bucket{le="+Inf"} 4']
+    assert lines[-1] == "h_count 4"
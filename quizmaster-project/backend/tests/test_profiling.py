@@ -0,0 +1,91 @@
+import asyncio, time
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.main import app
+from app.api import routes_admin
+from app.core import profiling
+from app.core.profiling import ProfilingMiddleware, param_shape, profiles, slow_queries
+
+client = TestClient(app)
+ADMIN = {"X-Admin-Token": "secret"}
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(routes_admin, "ADMIN_TOKEN", "secret")
+
+def login():
+    r = client.post("/auth/register", json={"email": "profiling@user.com", "password": "pw"})
+    if r.status_code == 400:
+        r = client.post("/auth/login", json={"email": "profiling@user.com", "password": "pw"})
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+def test_param_shape_never_keeps_values():
+    assert param_shape((1, "secret@example.com", None)) == "(int, str, NoneType)"
+    assert param_shape({"email": "secret@example.com"}) == "{email: str}"
+    # insertmanyvalues: flagged executemany, but one flat row of parameters
+    assert param_shape((1, "a", 2, "b"), executemany=True) == "(int, str, int, str)"
+    assert param_shape(tuple(range(12))).endswith("... 2 more)")
+
+def test_profile_needs_the_admin_token(admin):
+    headers = login()
+    assert "x-profile-id" not in client.get("/scores", headers={**headers, "X-Profile": "1"}).headers
+    assert "x-profile-id" not in client.get("/scores", headers={**headers, "X-Profile": "1", "X-Admin-Token": "wrong"}).headers
+
+    r = client.get("/scores?profile=1", headers={**headers, **ADMIN})
+    assert r.status_code == 200
+    report = client.get(f"/admin/profiles/{r.headers['x-profile-id']}", headers=ADMIN).json()
+    assert (report["route"], report["status"]) == ("/scores", 200)
+    assert report["db_queries"] >= 1
+    assert any(p["id"] == report["id"] for p in client.get("/admin/profiles", headers=ADMIN).json())
+    assert client.get("/admin/profiles/999999", headers=ADMIN).status_code == 404
+
+def test_profile_sees_cpu_work_and_awaits():
+    def busy():
+        end = time.perf_counter() + 0.2
+        while time.perf_counter() < end:
+            pass
+
+    async def handler(request):
+        busy()
+        await asyncio.sleep(0.2)
+        return PlainTextResponse("ok")
+
+    profiled = TestClient(ProfilingMiddleware(Starlette(routes=[Route("/", handler)]), authorize=lambda t: t == "s", interval_ms=1))
+    r = profiled.get("/", headers={"X-Profile": "1", "X-Admin-Token": "s"})
+    report = profiles.get(int(r.headers["x-profile-id"]))
+    assert report["samples"] > 10
+    leaves = {f["function"].split(" ")[0]: f["self_pct"] for f in report["leaves"]}
+    assert leaves["test_profile_sees_cpu_work_and_awaits.<locals>.busy"] > 0
+    assert leaves["(await)"] > 0
+    assert all(s["stack"].startswith("ProfilingMiddleware.__call__") for s in report["stacks"])
+
+def test_slow_query_log(admin, monkeypatch):
+    monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0)
+    client.get("/scores", headers=login())
+    r = client.get("/admin/slow-queries", params={"route": "/scores"}, headers=ADMIN).json()
+    assert r["threshold_ms"] == 0
+    q = r["queries"][0]
+    assert (q["method"], q["engine"]) == ("GET", "async")
+    assert "FROM attempts" in q["statement"] and q["params"].startswith("(")
+    assert client.get("/admin/slow-queries").status_code == 403
+
+def test_slow_query_log_handles_bulk_inserts(admin, monkeypatch):
+    from app.db import session
+    from app.db.models import Question
+
+    monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0)
+    # Score writer: insert(...).returning over several rows
+    rows = [{"total": 10, "correct": 5, "category": "9", "difficulty": "easy"}] * 3
+    assert client.post("/scores/batch", json=rows, headers=login()).status_code == 200
+    # ORM add_all, batched through insertmanyvalues
+    with session.SessionLocal() as db:
+        db.add_all([
+            Question(category=9, difficulty="easy", question=f"Bulk {i}?", correct_answer="a", incorrect_answers=["b"], fingerprint=f"bulk-{i}")
+            for i in range(3)
+        ])
+        db.commit()
+    inserts = [q for q in slow_queries.entries() if q["statement"].startswith("INSERT INTO questions")]
+    assert inserts and inserts[0]["params"].startswith("(")
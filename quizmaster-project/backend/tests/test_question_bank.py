@@ -0,0 +1,49 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.core import question_bank
+from app.db.models import Base
+
+
+def run_with_db(fn):
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            await fn(db)
+        await engine.dispose()
+    asyncio.run(main())
+
+
+def raw(text):
+    return {"question": text, "correct_answer": "A &amp; B", "incorrect_answers": ["C", "D&#039;s", "E"]}
+
+
+def test_parse_results_unescapes():
+    item = question_bank.parse_results([raw("What&#039;s up?")])[0]
+    assert item["question"] == "What's up?"
+    assert item["correct_answer"] == "A & B"
+    assert item["incorrect_answers"][1] == "D's"
+
+
+def test_store_dedupes_on_normalized_text():
+    async def check(db):
+        items = question_bank.parse_results([raw("Capital of France?"), raw("capital  of FRANCE?"), raw("Largest ocean?")])
+        assert await question_bank.store_questions(db, 9, "easy", items) == 2
+        assert await question_bank.store_questions(db, 9, "easy", items) == 0
+        # Partly known: only the new one counts, and the known ones don't raise
+        more = question_bank.parse_results([raw("Largest ocean?"), raw("Smallest planet?")])
+        assert await question_bank.store_questions(db, 9, "easy", more) == 1
+        assert await question_bank.bucket_size(db, 9, "easy") == 3
+    run_with_db(check)
+
+
+def test_sample_stays_in_bucket():
+    async def check(db):
+        await question_bank.store_questions(db, 9, "easy", question_bank.parse_results([raw(f"Q{i}") for i in range(5)]))
+        await question_bank.store_questions(db, 10, "easy", question_bank.parse_results([raw("Other")]))
+        rows = await question_bank.sample(db, 9, "easy", 3)
+        assert len(rows) == 3
+        assert all(r.category == 9 for r in rows)
+        assert len(await question_bank.sample(db, 9, "hard", 3)) == 0
+    run_with_db(check)
@@ -1,24 +1,217 @@
+import asyncio
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.api.routes_quiz import categories_cache
+from app.core.upstream import TriviaClient, get_trivia
 
 client = TestClient(app)
 
 def login():
-    r = client.post("/auth/login", json={"email":"demo@user.com","password":"demo"})
+    body = {"email":"demo@user.com","password":"demo"}
+    r = client.post("/auth/register", json=body)
+    if r.status_code == 400:
+        r = client.post("/auth/login", json=body)
     assert r.status_code == 200
     return {"Authorization": "Bearer " + r.json()["access_token"]}
 
+@pytest.fixture
+def upstream():
+    """Route trivia calls to a local handler instead of opentdb."""
+    calls = []
+    handlers = {}
+
+    def handle(request: httpx.Request):
+        calls.append(request)
+        return handlers[request.url.path](request)
+
+    trivia = TriviaClient(transport=httpx.MockTransport(handle), retry_base_delay=0)
+    app.dependency_overrides[get_trivia] = lambda: trivia
+    categories_cache.clear()
+    yield handlers, calls
+    app.dependency_overrides.clear()
+
 def test_categories_requires_auth():
     r = client.get("/quiz/categories")
     assert r.status_code in (401,403)
 
-def test_categories_mock(monkeypatch):
+def test_categories_mock(upstream):
+    handlers, calls = upstream
+    handlers["/api_category.php"] = lambda req: httpx.Response(200, json={"trivia_categories":[{"id":9,"name":"General Knowledge"}]})
     headers = login()
-    class MockResp:
-        def raise_for_status(self): pass
-        def json(self): return {"trivia_categories":[{"id":9,"name":"General Knowledge"}]}
-    import app.api.routes_quiz as rq
-    monkeypatch.setattr(rq.requests, "get", lambda *a, **k: MockResp())
     r = client.get("/quiz/categories", headers=headers)
     assert r.status_code == 200
     assert r.json()[0]["name"] == "General Knowledge"
+    client.get("/quiz/categories", headers=headers)
+    assert len(calls) == 1
+
+def test_categories_retries_on_429(upstream):
+    handlers, calls = upstream
+    responses = iter([httpx.Response(429), httpx.Response(200, json={"trivia_categories":[{"id":9,"name":"General Knowledge"}]})])
+    handlers["/api_category.php"] = lambda req: next(responses)
+    r = client.get("/quiz/categories", headers=login())
+    assert r.status_code == 200
+    assert len(calls) == 2
+
+def test_start_uses_bank_after_first_fetch(upstream):
+    handlers, calls = upstream
+    results = [{"question":f"Q&amp;{i}","correct_answer":"a","incorrect_answers":["b","c","d"]} for i in range(5)]
+    handlers["/api.php"] = lambda req: httpx.Response(200, json={"response_code":0,"results":results})
+    headers = login()
+    r = client.get("/quiz/start?category=11&difficulty=easy&amount=5", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["items"][0]["question"] == "Q&0"
+    r = client.get("/quiz/start?category=11&difficulty=easy&amount=5", headers=headers)
+    assert len(r.json()["items"]) == 5
+    assert len(calls) == 1
+
+def test_start_survives_a_failed_bank_write(upstream, monkeypatch):
+    from app.core import question_bank
+
+    async def broken(*a):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(question_bank, "store_questions", broken)
+    handlers, _ = upstream
+    results = [{"question":f"W{i}","correct_answer":"a","incorrect_answers":["b","c","d"]} for i in range(3)]
+    handlers["/api.php"] = lambda req: httpx.Response(200, json={"response_code":0,"results":results})
+    r = client.get("/quiz/start?category=13&difficulty=easy&amount=3", headers=login())
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 3
+
+def test_start_upstream_error_is_502(upstream):
+    handlers, _ = upstream
+    handlers["/api.php"] = lambda req: httpx.Response(500)
+    r = client.get("/quiz/start?category=12&difficulty=hard&amount=5", headers=login())
+    assert r.status_code == 502
+
+def test_start_amount_is_bounded(upstream):
+    headers = login()
+    for amount in (-1, 0, 51):
+        r = client.get(f"/quiz/start?category=11&difficulty=easy&amount={amount}", headers=headers)
+        assert r.status_code == 422
+
+def start_session(upstream, category):
+    handlers, calls = upstream
+    results = [{"question":f"S{i}","correct_answer":"a","incorrect_answers":["b","c","d"]} for i in range(3)]
+    handlers["/api.php"] = lambda req: httpx.Response(200, json={"response_code":0,"results":results})
+    headers = login()
+    r = client.get(f"/quiz/start?category={category}&difficulty=medium&amount=3", headers=headers)
+    assert r.status_code == 200
+    # Answers are only revealed one at a time, by POST .../answers
+    assert "correct_answer" not in r.text
+    assert sorted(r.json()["items"][0]["options"]) == ["a","b","c","d"]
+    return headers, r.json()["session_id"]
+
+def test_session_resume_answer_and_finish(upstream):
+    headers, sid = start_session(upstream, 21)
+    _, calls = upstream
+
+    r = client.get(f"/quiz/sessions/{sid}/next", headers=headers)
+    assert r.json()["index"] == 0 and sorted(r.json()["options"]) == ["a","b","c","d"]
+    r = client.post(f"/quiz/sessions/{sid}/answers", json={"index": 0, "answer": "a"}, headers=headers)
+    assert r.json() == {"index": 0, "correct": True, "correct_answer": "a", "answered": 1, "remaining": 2}
+    r = client.post(f"/quiz/sessions/{sid}/answers", json={"index": 1, "answer": "b"}, headers=headers)
+    assert r.json()["correct"] is False
+    assert client.post(f"/quiz/sessions/{sid}/answers", json={"index": 1, "answer": "a"}, headers=headers).status_code == 409
+
+    # A reload resumes the same questions (in the same order) without touching the upstream
+    r = client.get(f"/quiz/sessions/{sid}", headers=headers)
+    body = r.json()
+    assert body["answered"] == 2 and body["next_index"] == 2
+    assert [q["question"] for q in body["questions"]] == ["S0","S1","S2"]
+    assert "correct_answer" not in body["questions"][0]
+    assert len(calls) == 1
+
+    r = client.post(f"/quiz/sessions/{sid}/finish", headers=headers)
+    score = r.json()
+    assert (score["total"], score["correct"], score["category"], score["verified"]) == (3, 1, "21", True)
+    by_cat = {c["category"]: c for c in client.get("/scores/summary", headers=headers).json()["by_category"]}
+    assert by_cat["21"]["correct"] >= 1
+    # Finishing twice doesn't record a second attempt
+    assert client.post(f"/quiz/sessions/{sid}/finish", headers=headers).json()["id"] == score["id"]
+    assert client.post(f"/quiz/sessions/{sid}/answers", json={"index": 2, "answer": "a"}, headers=headers).status_code == 409
+    assert sum(s["id"] == score["id"] for s in client.get("/scores", headers=headers).json()) == 1
+
+def test_session_belongs_to_its_user(upstream):
+    _, sid = start_session(upstream, 22)
+    r = client.post("/auth/register", json={"email":"other-session@user.com","password":"pw"})
+    other = {"Authorization": "Bearer " + r.json()["access_token"]}
+    assert client.get(f"/quiz/sessions/{sid}", headers=other).status_code == 404
+    assert client.get("/quiz/sessions/nope", headers=login()).status_code == 404
+
+def test_finish_survives_a_concurrent_session_save(upstream, tmp_path, monkeypatch):
+    from app.api import routes_quiz
+    from app.core import quiz_sessions
+
+    store = quiz_sessions.SessionStore(path=str(tmp_path / "sessions.db"))
+    monkeypatch.setattr(quiz_sessions, "sessions", store)
+    headers, sid = start_session(upstream, 24)
+    real_committed = routes_quiz.committed
+
+    async def committed_then_touched(fut):
+        # Another worker saves the session while the attempt is being written
+        result = await real_committed(fut)
+        other = await store.get(sid)
+        await store.save(other)
+        return result
+    monkeypatch.setattr(routes_quiz, "committed", committed_then_touched)
+
+    r = client.post(f"/quiz/sessions/{sid}/finish", headers=headers)
+    assert r.status_code == 200
+    assert client.post(f"/quiz/sessions/{sid}/finish", headers=headers).json()["id"] == r.json()["id"]
+
+def test_sqlite_session_store_refuses_lost_updates(tmp_path):
+    from app.core.quiz_sessions import SessionConflict, SessionStore, new_session
+
+    async def main():
+        a, b = SessionStore(path=str(tmp_path / "sessions.db")), SessionStore(path=str(tmp_path / "sessions.db"))
+        s = new_session(1, 9, "easy", [{"question":"q","correct_answer":"a","incorrect_answers":["b"]}])
+        await a.save(s)
+        # Another worker reads and updates it
+        other = await b.get(s.id)
+        other.answers[0] = "a"
+        await b.save(other)
+        s.answers[0] = "b"
+        with pytest.raises(SessionConflict):
+            await a.save(s)
+        return (await a.get(s.id)).answers
+
+    assert asyncio.run(main()) == ["a"]
+
+def bank(*questions, category=23):
+    from app.db import session
+    from app.db.import_questions import import_rows, rows
+
+    raw = [{"difficulty":"easy","category":"History","question":q,"correct_answer":"a","incorrect_answers":["b","c","d"]} for q in questions]
+    with session.SessionLocal() as db:
+        import_rows(db, rows(raw, category)[0])
+
+def test_search_hides_answers():
+    bank("Which pharaoh built the Great Pyramid?", "Who was the last pharaoh of Egypt?", "When did Rome fall?")
+    headers = login()
+    r = client.get("/quiz/search", params={"q": "pharaoh"}, headers=headers)
+    assert r.status_code == 200
+    assert {h["question"] for h in r.json()} == {"Which pharaoh built the Great Pyramid?", "Who was the last pharaoh of Egypt?"}
+    assert set(r.json()[0]) == {"id", "category", "difficulty", "question"}
+    assert client.get("/quiz/search", params={"q": "pharaoh", "category": 9}, headers=headers).json() == []
+    assert client.get("/quiz/search", params={"q": ""}, headers=headers).status_code == 422
+
+def test_start_from_search_never_calls_upstream(upstream):
+    _, calls = upstream
+    bank(*(f"Volcano question number {i}?" for i in range(5)))
+    headers = login()
+    r = client.get("/quiz/start", params={"q": "volcano", "amount": 3}, headers=headers)
+    assert r.status_code == 200
+    assert len(r.json()["items"]) == 3 and all("Volcano" in i["question"] for i in r.json()["items"])
+    assert calls == []
+
+    sid = r.json()["session_id"]
+    assert client.get(f"/quiz/sessions/{sid}", headers=headers).json()["category"] is None
+    score = client.post(f"/quiz/sessions/{sid}/finish", headers=headers).json()
+    assert (score["category"], score["difficulty"]) == ("search", "mixed")
+
+    assert client.get("/quiz/start", params={"q": "nothingmatchesthis"}, headers=headers).status_code == 404
+    for amount in (-1, 0):
+        assert client.get("/quiz/start", params={"q": "volcano", "amount": amount}, headers=headers).status_code == 422
+    assert client.get("/quiz/start", headers=headers).status_code == 422
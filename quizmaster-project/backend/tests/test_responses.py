@@ -0,0 +1,60 @@
+import gzip, zlib
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from app.main import app
+from app.core import compression
+from app.core.compression import CompressionMiddleware, choose_encoding
+from app.core.responses import records
+
+client = TestClient(app)
+
+def register(email):
+    r = client.post("/auth/register", json={"email": email, "password": "pw"})
+    assert r.status_code == 200
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+def test_records_drops_extra_columns():
+    assert records([(1, "a", "cursor")], ["id", "name"]) == [{"id": 1, "name": "a"}]
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("br, gzip") == ("br" if compression.brotli else "gzip")
+
+def test_large_scores_page_is_gzipped():
+    headers = register("gzip@user.com")
+    body = [{"total": 10, "correct": i % 10, "category": "9", "difficulty": "easy"} for i in range(100)]
+    assert client.post("/scores/batch", json=body, headers=headers).status_code == 200
+
+    r = client.get("/scores", params={"limit": 100}, headers={**headers, "Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"] and "Authorization" in r.headers["vary"]
+    assert len(r.json()) == 100
+    assert set(r.json()[0]) == {"id", "total", "correct", "category", "difficulty", "verified"}
+
+    r = client.get("/scores", params={"limit": 1}, headers={**headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_offered():
+    headers = register("brotli@user.com")
+    body = [{"total": 10, "correct": 1, "category": "9", "difficulty": "easy"}] * 50
+    client.post("/scores/batch", json=body, headers=headers)
+    r = client.get("/scores", headers={**headers, "Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+    assert len(r.json()) == 50
+
+def test_streaming_body_is_compressed_per_chunk():
+    async def rows(request):
+        return StreamingResponse((b'{"n":%d}\n' % i for i in range(500)), media_type="application/x-ndjson")
+
+    streaming = TestClient(CompressionMiddleware(Starlette(routes=[Route("/rows", rows)])))
+    with streaming.stream("GET", "/rows", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        raw = b"".join(r.iter_raw())
+    assert gzip.decompress(raw).count(b"\n") == 500
+    # Every chunk ends on a sync flush, so a client can decode what it has so far
+    assert zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(raw[: len(raw) // 2])
@@ -0,0 +1,224 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+def register(email):
+    r = client.post("/auth/register", json={"email": email, "password": "pw"})
+    assert r.status_code == 200
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+def submit(headers, **kw):
+    body = {"total": 10, "correct": 5, "category": "9", "difficulty": "easy", **kw}
+    r = client.post("/scores", json=body, headers=headers)
+    assert r.status_code == 200
+    return r.json()
+
+def play(headers, **kw):
+    """A verified attempt, as a finished quiz session would record it."""
+    from jose import jwt
+    from app.db.writer import writer
+
+    uid = jwt.get_unverified_claims(headers["Authorization"].split()[1])["uid"]
+    row = {"total": 10, "correct": 5, "category": "9", "difficulty": "easy", "user_id": uid, "verified": True, **kw}
+    return writer.submit([row]).result(timeout=5)[0]
+
+def test_scores_are_keyset_paginated():
+    headers = register("pages@user.com")
+    ids = [submit(headers, correct=i)["id"] for i in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/scores", params=params, headers=headers)
+        assert r.status_code == 200
+        seen += [s["id"] for s in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == ids[::-1]
+
+def test_scores_filters():
+    headers = register("filters@user.com")
+    submit(headers, category="9", difficulty="easy")
+    submit(headers, category="10", difficulty="hard")
+    r = client.get("/scores", params={"category": "10"}, headers=headers)
+    assert [s["difficulty"] for s in r.json()] == ["hard"]
+    r = client.get("/scores", params={"difficulty": "easy"}, headers=headers)
+    assert [s["category"] for s in r.json()] == ["9"]
+
+def test_bad_cursor_is_400():
+    headers = register("cursor@user.com")
+    r = client.get("/scores", params={"cursor": "nope"}, headers=headers)
+    assert r.status_code == 400
+
+def test_summary_tracks_submissions():
+    headers = register("summary@user.com")
+    play(headers, category="9", difficulty="easy", total=10, correct=7)
+    play(headers, category="9", difficulty="hard", total=10, correct=3)
+    play(headers, category="10", difficulty="easy", total=5, correct=5)
+    # Client-reported scores are part of the player's own history too
+    submit(headers, category="9", difficulty="easy", total=10, correct=10)
+
+    s = client.get("/scores/summary", headers=headers).json()
+    assert s["overall"]["attempts"] == 4
+    assert s["overall"]["correct"] == 25
+    assert s["overall"]["accuracy"] == 0.7143
+    by_cat = {r["category"]: r for r in s["by_category"]}
+    assert by_cat["9"]["total"] == 30
+    by_diff = {r["difficulty"]: r for r in s["by_difficulty"]}
+    assert by_diff["easy"]["correct"] == 22
+    assert len(s["by_category_difficulty"]) == 3
+
+def test_leaderboard_orders_by_correct():
+    strong = register("strong@user.com")
+    weak = register("weak@user.com")
+    cheat = register("cheat@user.com")
+    play(strong, category="lb", total=10, correct=9)
+    play(weak, category="lb", total=10, correct=2)
+    # Client-reported scores can't climb the board, not even on top of verified ones
+    submit(cheat, category="lb", total=10, correct=10)
+    submit(weak, category="lb", total=10, correct=10)
+
+    board = client.get("/scores/leaderboard", params={"category": "lb"}, headers=weak).json()
+    assert [e["name"] for e in board] == ["strong", "weak"]
+    assert board[0]["rank"] == 1
+    assert board[0]["accuracy"] == 0.9
+    assert (board[1]["attempts"], board[1]["correct"]) == (1, 2)
+
+def test_rebuild_matches_incremental_rollups():
+    from sqlalchemy import select
+    from app.db.models import ScoreRollup
+    from app.db.rollups import rebuild
+    from app.db.session import SessionLocal
+
+    headers = register("rebuild@user.com")
+    play(headers, category="9", difficulty="easy", total=10, correct=4)
+    play(headers, category="9", difficulty="easy", total=10, correct=6)
+    submit(headers, category="9", difficulty="easy", total=10, correct=6)
+
+    snapshot = lambda db: sorted(
+        (r.user_id, r.category, r.difficulty, r.attempts, r.total, r.correct, r.verified_attempts, r.verified_total, r.verified_correct)
+        for r in db.scalars(select(ScoreRollup))
+    )
+    with SessionLocal() as db:
+        before = snapshot(db)
+        rebuild(db)
+        assert snapshot(db) == before
+
+def test_batch_submit_keeps_order_and_rollups():
+    headers = register("batch@user.com")
+    body = [{"total": 10, "correct": i, "category": "9", "difficulty": "easy"} for i in range(5)]
+    r = client.post("/scores/batch", json=body, headers=headers)
+    assert r.status_code == 200
+    saved = r.json()
+    assert [s["correct"] for s in saved] == list(range(5))
+    assert len({s["id"] for s in saved}) == 5
+    assert not any(s["verified"] for s in saved)
+    overall = client.get("/scores/summary", headers=headers).json()["overall"]
+    assert (overall["attempts"], overall["correct"]) == (5, 10)
+
+def test_impossible_scores_are_rejected():
+    headers = register("invalid@user.com")
+    good = {"total": 10, "correct": 5, "category": "9", "difficulty": "easy"}
+    for bad in ({"correct": 10**9, "total": 1}, {"correct": -1}, {"total": 0, "correct": 0}, {"total": -5, "correct": -6}):
+        assert client.post("/scores", json={**good, **bad}, headers=headers).status_code == 422
+        assert client.post("/scores/batch", json=[good, {**good, **bad}], headers=headers).status_code == 422
+    assert client.get("/scores", headers=headers).json() == []
+
+def test_concurrent_submits_are_group_committed():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.db.writer import writer
+
+    headers = register("group@user.com")
+    batches_before = writer.batches
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: submit(headers, correct=i % 11), range(16)))
+    assert len({r["id"] for r in results}) == 16
+    assert writer.batches - batches_before < 16
+    assert len(client.get("/scores", headers=headers).json()) == 16
+
+def test_bad_unit_does_not_fail_its_batch():
+    import pytest
+    from app.db.writer import AttemptWriter
+
+    w = AttemptWriter(max_delay=0.05)
+    good = w.submit([{"total": 1, "correct": 1, "category": "9", "difficulty": "easy", "user_id": 1}])
+    bad = w.submit([{"total": None, "correct": 1, "category": "9", "difficulty": "easy", "user_id": 1}])
+    assert good.result(timeout=5)[0].id
+    with pytest.raises(Exception):
+        bad.result(timeout=5)
+    w.close()
+
+def test_cancelled_submit_does_not_stop_the_writer():
+    from app.db.writer import AttemptWriter
+
+    row = {"total": 1, "correct": 1, "category": "9", "difficulty": "easy", "user_id": 1}
+    w = AttemptWriter(max_delay=0.5)
+    cancelled, live = w.submit([row]), w.submit([row])
+    assert cancelled.cancel()
+    assert live.result(timeout=5)[0].id
+    assert w.submit([row]).result(timeout=5)[0].id
+    assert w.rows == 2
+    w.close()
+
+def test_scores_conditional_get():
+    headers = register("etag@user.com")
+    submit(headers)
+    r = client.get("/scores", headers=headers)
+    etag = r.headers["ETag"]
+
+    r = client.get("/scores", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    # Different params are a different representation
+    r = client.get("/scores", params={"limit": 1}, headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+
+    submit(headers)
+    r = client.get("/scores", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert len(r.json()) == 2
+
+def test_etags_are_per_user():
+    a, b = register("etag-a@user.com"), register("etag-b@user.com")
+    etag = client.get("/scores/summary", headers=a).headers["ETag"]
+    assert client.get("/scores/summary", headers={**a, "If-None-Match": etag}).status_code == 304
+    assert client.get("/scores/summary", headers={**b, "If-None-Match": etag}).status_code == 200
+
+def test_export_streams_full_history():
+    import csv, io, json
+    from app.api import routes_scores
+
+    headers = register("export@user.com")
+    body = [{"total": 10, "correct": i % 10, "category": "9", "difficulty": "easy"} for i in range(7)]
+    ids = [s["id"] for s in client.post("/scores/batch", json=body, headers=headers).json()]
+
+    batch, routes_scores.EXPORT_BATCH = routes_scores.EXPORT_BATCH, 3
+    try:
+        r = client.get("/scores/export", headers=headers)
+        lines = [json.loads(l) for l in r.text.splitlines()]
+        assert r.headers["content-type"] == "application/x-ndjson"
+        assert [l["id"] for l in lines] == ids
+        assert set(lines[0]) == {"id", "total", "correct", "category", "difficulty", "verified", "created_at"}
+
+        r = client.get("/scores/export", params={"format": "csv"}, headers=headers)
+        rows = list(csv.DictReader(io.StringIO(r.text)))
+        assert [int(row["id"]) for row in rows] == ids
+        assert rows[3]["correct"] == "3"
+    finally:
+        routes_scores.EXPORT_BATCH = batch
+
+def test_account_deletion_cascades_in_the_database():
+    from sqlalchemy import func, select
+    from app.db.models import Attempt, ScoreRollup
+    from app.db.session import SessionLocal
+
+    headers = register("cascade@user.com")
+    uid = submit(headers)["id"]
+    with SessionLocal() as db:
+        user_id = db.get(Attempt, uid).user_id
+    assert client.delete("/auth/me", headers=headers).status_code == 204
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(Attempt).where(Attempt.user_id == user_id)) == 0
+        assert db.scalar(select(func.count()).select_from(ScoreRollup).where(ScoreRollup.user_id == user_id)) == 0
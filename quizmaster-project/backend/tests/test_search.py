@@ -0,0 +1,58 @@
+import asyncio, json
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from app.db import search
+from app.db.import_questions import import_rows, read_dump, rows
+from app.db.models import Base
+
+
+def raw(text, category="Science: Computers", type="multiple"):
+    return {"type": type, "difficulty": "easy", "category": category, "question": text, "correct_answer": "a", "incorrect_answers": ["b", "c", "d"]}
+
+
+def test_read_dump_accepts_api_responses_lists_and_ndjson(tmp_path):
+    items = [raw("One?"), raw("Two?")]
+    (tmp_path / "a.json").write_text(json.dumps({"response_code": 0, "results": items}))
+    (tmp_path / "b.json").write_text(json.dumps(items))
+    (tmp_path / "c.ndjson").write_text("\n".join(json.dumps(i) for i in items) + "\n")
+    assert [read_dump(tmp_path / n) for n in ("a.json", "b.json", "c.ndjson")] == [items] * 3
+
+
+def test_rows_map_categories_dedupe_and_skip():
+    new, skipped = rows([
+        raw("Who wrote &quot;Dune&quot;?", "Entertainment: Books"),
+        raw("who wrote  \"dune\"?", "Entertainment: Books"),
+        raw("Musicals?", "Entertainment: Musicals &amp; Theatres"),
+        raw("Unknown?", "Not a category"),
+        raw("True?", type="boolean"),
+    ])
+    assert skipped == 2
+    assert [(r["question"], r["category"]) for r in new] == [('Who wrote "Dune"?', 10), ("Musicals?", 13)]
+    assert rows([raw("Any?", "Not a category")], category=9, difficulty="hard")[0][0]["difficulty"] == "hard"
+
+
+def test_import_then_search(tmp_path):
+    url = f"sqlite:///{tmp_path / 'bank.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        search.create_index(conn)
+    new, _ = rows([raw("Which planet is the largest?"), raw("Which ocean is the largest?"), raw("Who painted the Mona Lisa?", "Art")])
+    with Session(engine) as db:
+        assert import_rows(db, new, batch_size=2) == 3
+        assert import_rows(db, new) == 0
+    engine.dispose()
+
+    async def check():
+        engine = create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:"))
+        async with AsyncSession(engine) as db:
+            # Prefix match, stemming, every word required
+            assert {q.question for q in await search.search(db, "larg", 10)} == {"Which planet is the largest?", "Which ocean is the largest?"}
+            assert [q.question for q in await search.search(db, "planets LARGEST", 10)] == ["Which planet is the largest?"]
+            assert [q.category for q in await search.search(db, "who", 10, category=25)] == [25]
+            # FTS syntax in the query is just text
+            assert await search.search(db, 'mona" OR "x', 10) == []
+            assert await search.search(db, "?!", 10) == []
+        await engine.dispose()
+    asyncio.run(check())
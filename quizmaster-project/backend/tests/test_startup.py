@@ -0,0 +1,50 @@
+import json, os, shutil, sqlite3, subprocess, sys, tempfile
+from pathlib import Path
+import pytest
+from sqlalchemy import create_engine
+from app.db.schema import SchemaOutOfDate, alembic_head, ensure_schema
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import asyncio, json, os, sys
+import app.main
+imported = [m for m in ("requests", "google.auth", "passlib", "alembic") if m in sys.modules]
+touched = os.path.exists(sys.argv[1])
+
+async def boot():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        pass
+
+asyncio.run(boot())
+print(json.dumps({"imported": imported, "touched": touched}))
+"""
+
+def test_import_is_side_effect_free_and_lifespan_creates_schema():
+    db = os.path.join(tempfile.mkdtemp(), "fresh.db")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, db], cwd=BACKEND, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{db}", "WARM_UP": "0"},
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result == {"imported": [], "touched": False}
+    tables = {r[0] for r in sqlite3.connect(db).execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"users", "attempts", "score_rollups", "questions"} <= tables
+
+def test_ensure_schema_only_creates_missing_tables():
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "schema.db"))
+    assert "users" in ensure_schema(engine)
+    assert ensure_schema(engine) == []
+    engine.dispose()
+
+def test_unmigrated_database_stops_startup(tmp_path):
+    # The committed demo database predates several migrations and was never stamped
+    shutil.copy(BACKEND / "quiz.db", tmp_path / "old.db")
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with pytest.raises(SchemaOutOfDate, match="users.token_version.*alembic upgrade head"):
+        ensure_schema(engine)
+    engine.dispose()
+
+def test_alembic_head_matches_latest_migration():
+    latest = sorted((BACKEND / "migrations" / "versions").glob("*.py"))[-1]
+    assert alembic_head() == latest.name.split("_")[0]